@@ -150,13 +150,9 @@ JSON response:"""
         if not slots:
             return "No available slots found."
 
-        def format_duration(iso_duration: str) -> str:
-            """Convert PT30M to '30 min'"""
-            import re
-            hours = re.search(r'(\d+)H', iso_duration)
-            minutes = re.search(r'(\d+)M', iso_duration)
-            h = int(hours.group(1)) if hours else 0
-            m = int(minutes.group(1)) if minutes else 0
+        def format_duration(total_minutes: int) -> str:
+            """Convert 30 to '30 min'"""
+            h, m = divmod(total_minutes, 60)
             parts = []
             if h > 0:
                 parts.append(f"{h} hour" if h == 1 else f"{h} hours")
@@ -166,11 +162,10 @@ JSON response:"""
 
         lines = []
         for i, slot in enumerate(slots[:max_slots]):
-            start_dt = datetime.fromisoformat(slot['start_time'])
-            end_dt = datetime.fromisoformat(slot['end_time'])
-            duration = format_duration(slot['duration'])
+            # Slots come with their times already parsed
+            duration = format_duration(slot.duration_minutes)
             lines.append(
-                f"{i+1}. **{start_dt.strftime('%I:%M %p')}** - {end_dt.strftime('%I:%M %p')} "
+                f"{i+1}. **{slot.start.strftime('%I:%M %p')}** - {slot.end.strftime('%I:%M %p')} "
                 f"({duration})"
             )
 
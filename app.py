@@ -2,38 +2,73 @@
 Badminton Court Booking Application
 """
 import streamlit as st
-import re
-from datetime import datetime, timedelta
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, date
+from typing import Optional
 from auth import UserAuth
 from storage import SecureStorage
 from perfectgym_client import PerfectGymClient
 from ai_chat_helper import AIChatHelper
+from schedule_warmer import ScheduleWarmer
+from client_pool import ClientPool, shared_client_pool
+from schedule_cache import ScheduleResult
+from schedule_parser import group_by_date
+
+
+@st.cache_resource
+def get_user_auth() -> UserAuth:
+    """User store, created once per process rather than on every rerun"""
+    return UserAuth()
+
+
+@st.cache_resource
+def get_storage() -> SecureStorage:
+    """Credential storage, created once per process rather than on every rerun"""
+    return SecureStorage()
+
+
+@st.cache_resource
+def get_client_pool() -> ClientPool:
+    """Pool of logged-in PerfectGym clients shared by every session in the process"""
+    return shared_client_pool
+
+
+@st.cache_resource
+def get_ai_helper() -> AIChatHelper:
+    """Chat helper (and its Gemini model), configured once per process"""
+    return AIChatHelper()
 
 
 # Initialize services
-user_auth = UserAuth()
-storage = SecureStorage()
+user_auth = get_user_auth()
+storage = get_storage()
+
+# Cookie holding the signed session token that keeps a user logged in across page reloads
+SESSION_COOKIE = os.getenv("SESSION_COOKIE", "court_booking_session")
+
+# Seconds to wait for PerfectGym before showing an older cached schedule instead
+SCHEDULE_DEADLINE = float(os.getenv("SCHEDULE_DEADLINE", "3"))
 
+# Seconds a fetched schedule and its formatted rows stay in Streamlit's data cache
+SCHEDULE_VIEW_TTL = float(os.getenv("SCHEDULE_VIEW_TTL", os.getenv("SCHEDULE_CACHE_TTL", "60")))
 
-def format_duration(iso_duration: str) -> str:
+# Slots per page of the schedule table (bounds render cost however many slots there are)
+SCHEDULE_PAGE_SIZE = int(os.getenv("SCHEDULE_PAGE_SIZE", "100"))
+
+
+def format_minutes(total_minutes: int) -> str:
     """
-    Convert ISO 8601 duration (e.g., PT30M, PT1H, PT1H30M) to friendly text
+    Format a duration in minutes as friendly text
 
     Args:
-        iso_duration: ISO 8601 duration string like 'PT30M'
+        total_minutes: Duration in minutes (e.g. a Slot's duration_minutes)
 
     Returns:
         Friendly duration string like '30 min' or '1 hour 30 min'
     """
-    if not iso_duration:
-        return "Unknown"
-
-    # Parse hours and minutes from PT1H30M format
-    hours_match = re.search(r'(\d+)H', iso_duration)
-    minutes_match = re.search(r'(\d+)M', iso_duration)
-
-    hours = int(hours_match.group(1)) if hours_match else 0
-    minutes = int(minutes_match.group(1)) if minutes_match else 0
+    hours, minutes = divmod(total_minutes, 60)
 
     parts = []
     if hours > 0:
@@ -44,6 +79,13 @@ def format_duration(iso_duration: str) -> str:
     return " ".join(parts) if parts else "Unknown"
 
 
+def format_age(seconds: float) -> str:
+    """Format a data age like '45 seconds' or '3 minutes'"""
+    if seconds < 90:
+        return f"{seconds:.0f} seconds"
+    return f"{seconds / 60:.0f} minutes"
+
+
 def init_session_state():
     """Initialize session state variables"""
     if 'logged_in' not in st.session_state:
@@ -55,6 +97,105 @@ def init_session_state():
     if 'perfectgym_client' not in st.session_state:
         st.session_state.perfectgym_client = None
 
+    # Session links of earlier versions carried the token in the URL: drop it from there
+    st.query_params.pop("session", None)
+
+    # A reload starts a fresh session: restore the login from the signed token in the session cookie.
+    # Browser cookies are only read when the page loads, so after a logout the old one is ignored
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if not st.session_state.logged_in and token and st.session_state.get("restore_session", True):
+        username = user_auth.verify_session_token(token)
+        if username:
+            st.session_state.logged_in = True
+            st.session_state.username = username
+            st.session_state.page = 'main'
+        else:
+            st.session_state.restore_session = False
+            set_session_cookie(None)
+
+
+def start_session(username: str):
+    """Mark the user logged in and store a signed session token in a cookie so reloads keep them logged in"""
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    st.session_state.page = 'main'
+    set_session_cookie(user_auth.issue_session_token(username))
+
+
+def set_session_cookie(token: Optional[str]):
+    """
+    Queue the session cookie to be set (or cleared, for None) on the next render
+
+    Args:
+        token: Signed session token, or None to remove the cookie
+    """
+    st.session_state.pending_session_cookie = token or ""
+
+
+def write_session_cookie():
+    """Set or clear the session cookie queued by set_session_cookie, if any"""
+    token = st.session_state.pop("pending_session_cookie", None)
+    if token is None:
+        return
+
+    max_age = int(user_auth.session_ttl) if token else 0
+    st.html(f"""<script>
+        const secure = location.protocol === "https:" ? "; Secure" : "";
+        document.cookie = {json.dumps(SESSION_COOKIE)} + "=" + {json.dumps(token)}
+            + "; Max-Age={max_age}; Path=/; SameSite=Strict" + secure;
+    </script>""", unsafe_allow_javascript=True)
+
+
+@st.cache_resource
+def get_schedule_warmer() -> Optional[ScheduleWarmer]:
+    """
+    Start one background schedule warmer per process
+
+    Off unless ENABLE_SCHEDULE_WARMER is set, and only with a dedicated service account
+    (PERFECTGYM_EMAIL / PERFECTGYM_PASSWORD): it never borrows an app user's credentials.
+    The login and the first refresh run on the warmer thread, which retries a failed login
+    with a growing delay, so no rerun ever waits on (or repeats) them.
+    """
+    if os.getenv("ENABLE_SCHEDULE_WARMER", "false").lower() not in ("1", "true", "yes"):
+        return None
+
+    email = os.getenv("PERFECTGYM_EMAIL")
+    password = os.getenv("PERFECTGYM_PASSWORD")
+    if not email or not password:
+        print("Schedule warmer not started: set PERFECTGYM_EMAIL and PERFECTGYM_PASSWORD")
+        return None
+
+    warmer = ScheduleWarmer(
+        PerfectGymClient(),
+        days=int(os.getenv("WARMER_DAYS", "14")),
+        interval=float(os.getenv("WARMER_INTERVAL", "45")),
+        email=email,
+        password=password
+    )
+    warmer.start()
+    return warmer
+
+
+def get_perfectgym_client(creds: dict) -> Optional[PerfectGymClient]:
+    """
+    Logged-in client for the user's PerfectGym account, shared with every other
+    session (tab) using the same account through the process-wide client pool
+    """
+    if 'client_lease' not in st.session_state:
+        st.session_state.client_lease = uuid.uuid4().hex
+
+    client = get_client_pool().acquire(creds['email'], creds['password'], st.session_state.client_lease)
+    st.session_state.perfectgym_client = client
+    return client
+
+
+def release_perfectgym_client():
+    """Give up this session's lease on its pooled client"""
+    creds = storage.get_credentials(st.session_state.username) if st.session_state.username else None
+    if creds and 'client_lease' in st.session_state:
+        get_client_pool().release(creds['email'], st.session_state.client_lease)
+    st.session_state.perfectgym_client = None
+
 
 def login_page():
     """Display login/register page"""
@@ -69,9 +210,7 @@ def login_page():
 
         if st.button("Login", type="primary"):
             if user_auth.authenticate(username, password):
-                st.session_state.logged_in = True
-                st.session_state.username = username
-                st.session_state.page = 'main'
+                start_session(username)
                 st.rerun()
             else:
                 st.error("Invalid username or password")
@@ -111,8 +250,10 @@ def setup_credentials_page():
             else:
                 # Test the credentials
                 with st.spinner("Testing credentials..."):
-                    client = PerfectGymClient()
-                    if client.login(email, password):
+                    # Drop the lease on the old account first, or its client stays pinned until it idles out
+                    release_perfectgym_client()
+                    client = get_perfectgym_client({'email': email, 'password': password})
+                    if client:
                         # Save credentials
                         storage.save_credentials(st.session_state.username, email, password)
                         st.success("✅ Credentials saved successfully!")
@@ -153,10 +294,12 @@ def main_page():
         st.divider()
 
         if st.button("Logout", type="secondary"):
+            release_perfectgym_client()
             st.session_state.logged_in = False
             st.session_state.username = None
-            st.session_state.perfectgym_client = None
             st.session_state.page = 'login'
+            st.session_state.restore_session = False
+            set_session_cookie(None)
             st.rerun()
 
     # Check credentials before showing main content
@@ -167,6 +310,9 @@ def main_page():
             st.rerun()
         return
 
+    # Keep the schedule warm so the chat and schedule pages never wait on PerfectGym
+    get_schedule_warmer()
+
     # Main content based on navigation
     if selected_page == "💬 Chat":
         chat_page()
@@ -240,7 +386,7 @@ def chat_page():
 
 def process_chat_message(message: str) -> str:
     """Process user message and return response using AI"""
-    ai_helper = AIChatHelper()
+    ai_helper = get_ai_helper()
 
     # Get chat history for context
     chat_history = st.session_state.get('chat_messages', [])
@@ -278,36 +424,29 @@ def process_chat_message(message: str) -> str:
         except:
             return "I had trouble parsing that date. Please try again!"
 
-        # Get credentials and reuse or create client
+        # Get the shared client for this account (logs in only if no session is live)
         creds = storage.get_credentials(st.session_state.username)
-        client = st.session_state.get('perfectgym_client')
+        client = get_perfectgym_client(creds)
+        if not client:
+            return "❌ Failed to connect to PerfectGym. Please check your credentials in Settings."
 
-        # Check if we need to login
-        if not client or not client.is_session_valid():
-            client = PerfectGymClient()
-            if not client.login(creds['email'], creds['password']):
-                return "❌ Failed to connect to PerfectGym. Please check your credentials in Settings."
-            st.session_state.perfectgym_client = client
+        # Fetch schedule (the index is built once per fetch and shared across chat turns)
+        index = client.get_schedule_index(days=14, deadline=SCHEDULE_DEADLINE)
 
-        # Fetch schedule
-        schedule = client.get_schedule(days=14)
-
-        if not schedule:
+        if not index:
             return f"No available slots found around {date.strftime('%A, %B %d')}."
 
-        # Filter slots for the requested date
-        matching_slots = [
-            slot for slot in schedule
-            if slot['start_time'].startswith(date_str)
-        ]
-
-        # Filter by time if specified
+        # Slots on the requested date, starting at the requested HH:MM if specified
         if time_str:
-            # Match HH:MM format in the start_time
-            matching_slots = [
-                slot for slot in matching_slots
-                if time_str in slot['start_time']
-            ]
+            try:
+                start_time = datetime.strptime(time_str, '%H:%M').time()
+            except ValueError:
+                return "I had trouble parsing that time. Please try again!"
+            # A datetime window can cross midnight (23:59 + 1 minute), a time-of-day one would wrap
+            window_start = datetime.combine(date, start_time)
+            matching_slots = index.between(window_start, window_start + timedelta(minutes=1))
+        else:
+            matching_slots = index.on_date(date)
 
         if not matching_slots:
             if time_str:
@@ -320,11 +459,12 @@ def process_chat_message(message: str) -> str:
 
         # Create booking link for first slot
         first_slot = matching_slots[0]
-        slot_dt = datetime.fromisoformat(first_slot['start_time'])
-        booking_url = client.get_booking_url(slot_dt)
+        booking_url = client.get_booking_url(first_slot.start)
 
         response = f"{friendly_response}\n\n" if friendly_response else ""
         response += f"**Available on {date.strftime('%A, %B %d')}:**\n\n{formatted_slots}\n\n"
+        if index.age > client.schedule_cache.ttl:
+            response += f"_Availability as of {format_age(index.age)} ago; it may have changed since._\n\n"
 
         if intent == "book":
             response += f"👉 [Click here to book]({booking_url})"
@@ -364,27 +504,32 @@ def view_schedule_page():
             # Get credentials
             creds = storage.get_credentials(st.session_state.username)
 
-            # Reuse existing client or create new one
-            client = st.session_state.get('perfectgym_client')
-
-            # Check if we need to login
-            if not client or not client.is_session_valid():
-                client = PerfectGymClient()
-                if client.login(creds['email'], creds['password']):
-                    st.session_state.perfectgym_client = client
-                else:
-                    st.error("❌ Failed to connect to PerfectGym. Please check your credentials in Settings.")
-                    st.stop()
-
-            # Convert selected_date to datetime for the API
-            selected_datetime = datetime.combine(selected_date, datetime.min.time())
-
-            # Fetch schedule for the selected date
-            schedule = client.get_schedule(date=selected_datetime, days=days_to_show)
+            # Get the shared client for this account (logs in only if no session is live)
+            client = get_perfectgym_client(creds)
+            if not client:
+                st.error("❌ Failed to connect to PerfectGym. Please check your credentials in Settings.")
+                st.stop()
+
+            # Fetch schedule for the selected date (shared by every session for SCHEDULE_VIEW_TTL)
+            cache_args = (selected_date, days_to_show, client.club_id, client.zone_type_id, client)
+            schedule = fetch_schedule(*cache_args)
+            if schedule.stale:
+                # Staleness is judged now, so a copy that aged in the data cache is fetched again
+                fetch_schedule.clear(*cache_args)
+                schedule = fetch_schedule(*cache_args)
+            if schedule.stale or not schedule:
+                # Don't keep handing out a stale copy or a failed fetch for the whole TTL
+                fetch_schedule.clear(*cache_args)
 
             # Store in session state for persistence
             st.session_state.schedule_data = schedule
             st.session_state.schedule_client = client
+            # Windows cut from one snapshot share its fetched_at, so the key names the window too
+            st.session_state.schedule_key = (selected_date, days_to_show, client.club_id, client.zone_type_id,
+                                             schedule.fetched_at)
+            # Start the new schedule on its first page, all days
+            st.session_state.pop("schedule_page", None)
+            st.session_state.pop("schedule_day", None)
 
     # Display schedule if available
     if 'schedule_data' in st.session_state and st.session_state.schedule_data:
@@ -392,50 +537,130 @@ def view_schedule_page():
         client = st.session_state.schedule_client
 
         st.success(f"✅ Found {len(schedule)} available slots")
+        if getattr(schedule, 'stale', False):
+            st.info(f"🕒 Showing availability from {format_age(schedule.age)} ago while it refreshes. "
+                    "Fetch again in a moment for the latest.")
 
-        # Group by date
-        from collections import defaultdict
-        by_date = defaultdict(list)
+        # Grouped, formatted rows are cached per fetched schedule, so widget-only reruns reuse them
+        view = schedule_view(st.session_state.schedule_key, schedule, client)
 
-        for slot in schedule:
-            start_dt = datetime.fromisoformat(slot['start_time'])
-            date_key = start_dt.strftime('%A, %B %d, %Y')
-            by_date[date_key].append(slot)
+        layout = st.radio("Layout", ["Table", "List"], horizontal=True, key="schedule_layout",
+                          help="Table shows one page of slots at a time and stays fast for long date ranges")
+        if layout == "Table":
+            render_schedule_table(view)
+        else:
+            render_schedule_list(view)
 
-        # Display by date
-        for date_str in sorted(by_date.keys(), key=lambda x: datetime.strptime(x, '%A, %B %d, %Y')):
-            st.subheader(f"📆 {date_str}")
 
-            slots = by_date[date_str]
+@st.cache_data(ttl=SCHEDULE_VIEW_TTL, max_entries=64, show_spinner=False)
+def fetch_schedule(first_day: date, days: int, club_id: int, zone_type_id: int,
+                   _client: PerfectGymClient) -> ScheduleResult:
+    """
+    Schedule for a date range, shared by every session (availability does not depend on the user)
+
+    Args:
+        first_day: First day to show
+        days: Number of days to show
+        club_id: Club of the client (part of the cache key)
+        zone_type_id: Zone type of the client (part of the cache key)
+        _client: Logged-in client to fetch with (not part of the cache key)
+    """
+    return _client.get_schedule(date=datetime.combine(first_day, datetime.min.time()), days=days,
+                                deadline=SCHEDULE_DEADLINE)
 
-            # Show first 10 slots per day, with option to show more
-            display_count = 10
-            if f"show_more_{date_str}" in st.session_state:
-                display_count = len(slots)
 
-            for slot in slots[:display_count]:
-                start_dt = datetime.fromisoformat(slot['start_time'])
-                end_dt = datetime.fromisoformat(slot['end_time'])
+# Columns of a schedule row (rows are plain tuples: they come out of the data cache on every rerun)
+SCHEDULE_COLUMNS = ("Day", "Start", "End", "Duration", "Book")
 
-                col1, col2, col3 = st.columns([3, 2, 1])
 
-                with col1:
-                    st.write(f"⏰ **{start_dt.strftime('%I:%M %p')}** - {end_dt.strftime('%I:%M %p')}")
+def schedule_rows(slots: list, client: PerfectGymClient) -> list:
+    """One schedule row per slot, in SCHEDULE_COLUMNS order: day, times, duration and booking link"""
+    return [(
+        slot.start.strftime('%a, %b %d'),
+        slot.start.strftime('%I:%M %p'),
+        slot.end.strftime('%I:%M %p'),
+        format_minutes(slot.duration_minutes),
+        client.get_booking_url(slot.start)
+    ) for slot in slots]
 
-                with col2:
-                    st.write(f"⏱️ Duration: {format_duration(slot['duration'])}")
 
-                with col3:
-                    booking_url = client.get_booking_url(start_dt)
-                    st.link_button("📱 Book", booking_url, use_container_width=True)
+@st.cache_data(ttl=SCHEDULE_VIEW_TTL, max_entries=64, show_spinner=False)
+def schedule_view(schedule_key: tuple, _schedule: list, _client: PerfectGymClient) -> list:
+    """
+    A fetched schedule grouped by day, with its rows formatted for display
 
-                st.divider()
+    Args:
+        schedule_key: Identifies the fetched schedule: fetch_schedule's arguments plus its
+            fetched_at (the cache key; hashing the slots themselves on every rerun would
+            cost about as much as formatting them)
+        _schedule: The fetched slots
+        _client: Client the schedule was fetched with (for booking links)
 
-            # Show more button
-            if len(slots) > 10 and f"show_more_{date_str}" not in st.session_state:
-                if st.button(f"Show {len(slots) - 10} more slots", key=f"btn_more_{date_str}"):
-                    st.session_state[f"show_more_{date_str}"] = True
-                    st.rerun()
+    Returns:
+        List of (day, date label, rows) in day order, rows as produced by schedule_rows
+    """
+    return [(day, day.strftime('%A, %B %d, %Y'), schedule_rows(slots, _client))
+            for day, slots in group_by_date(_schedule).items()]
+
+
+def render_schedule_table(view: list):
+    """Show slots as a table with booking links, one page at a time (a few widgets however many slots)"""
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        day = st.selectbox("Day", [None] + [day for day, _, _ in view], key="schedule_day",
+                           format_func=lambda d: "All days" if d is None else d.strftime('%A, %B %d, %Y'),
+                           on_change=lambda: st.session_state.pop("schedule_page", None))
+    if day is None:
+        rows = [row for _, _, day_rows in view for row in day_rows]
+    else:
+        rows = next((day_rows for view_day, _, day_rows in view if view_day == day), [])
+
+    pages = max(1, -(-len(rows) // SCHEDULE_PAGE_SIZE))
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="schedule_page")
+
+    first = (page - 1) * SCHEDULE_PAGE_SIZE
+    page_rows = rows[first:first + SCHEDULE_PAGE_SIZE]
+    st.dataframe(
+        {column: [row[i] for row in page_rows] for i, column in enumerate(SCHEDULE_COLUMNS)},
+        column_config={"Book": st.column_config.LinkColumn("Book", display_text="📱 Book")},
+        hide_index=True,
+        width="stretch"
+    )
+    if rows:
+        st.caption(f"Slots {first + 1}-{first + len(page_rows)} of {len(rows)} (page {page} of {pages})")
+
+
+def render_schedule_list(view: list):
+    """Show slots one row of widgets each, grouped by day (first 10 per day unless expanded)"""
+    # Display by date
+    for _, date_str, rows in view:
+        st.subheader(f"📆 {date_str}")
+
+        # Show first 10 slots per day, with option to show more
+        display_count = 10
+        if f"show_more_{date_str}" in st.session_state:
+            display_count = len(rows)
+
+        for _, start, end, duration, booking_url in rows[:display_count]:
+            col1, col2, col3 = st.columns([3, 2, 1])
+
+            with col1:
+                st.write(f"⏰ **{start}** - {end}")
+
+            with col2:
+                st.write(f"⏱️ Duration: {duration}")
+
+            with col3:
+                st.link_button("📱 Book", booking_url, use_container_width=True)
+
+            st.divider()
+
+        # Show more button
+        if len(rows) > 10 and f"show_more_{date_str}" not in st.session_state:
+            if st.button(f"Show {len(rows) - 10} more slots", key=f"btn_more_{date_str}"):
+                st.session_state[f"show_more_{date_str}"] = True
+                st.rerun()
 
 
 def my_bookings_page():
@@ -487,6 +712,7 @@ def settings_page():
             st.rerun()
 
         if st.button("Remove Credentials", type="secondary"):
+            release_perfectgym_client()
             storage.delete_credentials(st.session_state.username)
             st.success("Credentials removed")
             st.rerun()
@@ -509,6 +735,8 @@ def settings_page():
             if new_password != confirm_new:
                 st.error("New passwords do not match")
             elif user_auth.change_password(st.session_state.username, old_password, new_password):
+                # The change revoked older session tokens, this one included: issue a new one
+                set_session_cookie(user_auth.issue_session_token(st.session_state.username))
                 st.success("Password changed successfully")
             else:
                 st.error("Current password is incorrect")
@@ -523,6 +751,7 @@ def main():
     )
 
     init_session_state()
+    write_session_cookie()
 
     # Route to appropriate page
     if not st.session_state.logged_in:
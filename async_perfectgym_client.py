@@ -0,0 +1,473 @@
+"""
+Asyncio-native PerfectGym API client
+
+Mirrors PerfectGymClient (login, get_schedule, book_court, get_my_bookings,
+cancel_booking) on top of a pooled httpx.AsyncClient, so a single event loop
+can serve many concurrent schedule fetches and bookings without tying up threads.
+It follows the same resilience policy: shared backoff, retry budget and
+breakers, and the last good schedule / bookings (flagged stale) when
+PerfectGym fails.
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, Callable, Hashable
+from urllib.parse import urlsplit
+
+import httpx
+
+from perfectgym_client import DEFAULT_BASE_URL, DEFAULT_HEADERS, BookingsResult
+from resilience import shared_resilience
+from schedule_cache import shared_schedule_cache, ScheduleSnapshot, ScheduleResult
+from schedule_parser import Slot, schedule_horizon, shared_parse_memo
+
+
+class AsyncPerfectGymClient:
+    """Async client for PerfectGym API"""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, max_connections: int = 100,
+                 max_keepalive_connections: int = 20):
+        """
+        Args:
+            base_url: PerfectGym site to talk to (point at a local stand-in server for testing)
+            max_connections: Upper bound on concurrent connections in the pool
+            max_keepalive_connections: Idle connections kept open for reuse
+        """
+        self.base_url = base_url
+        self.club_id = 1  # From the URL
+        self.zone_type_id = 28  # From the URL (badminton courts)
+        self.access_token = None
+        self.user_id = None
+        self.email = None
+        self.password = None  # Store for auto-refresh
+        self.last_activity = None
+
+        # Timeout and retry settings
+        self.timeout = 30  # seconds
+        self.max_retries = 3
+        self.resilience = shared_resilience  # backoff, retry budget and breakers, shared with the sync client
+        self.wizard_step_delay = 0.5  # seconds between booking wizard steps
+
+        self.schedule_cache = shared_schedule_cache
+        # When PerfectGym fails, cached schedules up to stale_if_error seconds old are served instead
+        self.stale_if_error = float(os.getenv("SCHEDULE_STALE_IF_ERROR", "3600"))
+        self._last_bookings = BookingsResult(stale=True)  # served (flagged stale) while MyBookings is failing
+
+        self.http = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            )
+        )
+
+        # Coalescing of identical in-flight reads and concurrent re-logins
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._login_lock = asyncio.Lock()
+        self._auth_generation = 0
+
+    async def __aenter__(self) -> "AsyncPerfectGymClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool"""
+        await self.http.aclose()
+
+    async def _make_request_with_retry(self, method: str, url: str, **kwargs) -> Tuple[bool, Optional[httpx.Response]]:
+        """
+        Make HTTP request with retry logic and timeout handling
+
+        Returns:
+            Tuple of (success: bool, response: Optional[Response])
+        """
+        endpoint = urlsplit(url).path
+        breaker = self.resilience.breaker(endpoint)
+        self.resilience.budget.record_request()
+
+        for attempt in range(self.max_retries):
+            if not breaker.allow_request():
+                print(f"Circuit open for {endpoint}, not sending request")
+                self.resilience.record_rejected(endpoint)
+                return False, None
+
+            try:
+                auth_generation = self._auth_generation
+                response = await self.http.request(method, url, **kwargs)
+
+                # Update last activity time
+                self.last_activity = datetime.now()
+
+                if response.status_code >= 500 or response.status_code == 429:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                # Check for session expiration (401 or 403)
+                if response.status_code in [401, 403]:
+                    if self.email and self.password and attempt < self.max_retries - 1:
+                        print(f"Session expired, attempting to re-login... (attempt {attempt + 1})")
+                        if await self._refresh_login(auth_generation):
+                            continue
+                    return False, response
+
+                return True, response
+
+            except httpx.TimeoutException:
+                print(f"Request timeout (attempt {attempt + 1}/{self.max_retries})")
+                breaker.record_failure()
+                if attempt < self.max_retries - 1 and self.resilience.budget.try_retry():
+                    await asyncio.sleep(self.resilience.backoff.delay(attempt))
+                    continue
+                return False, None
+
+            except httpx.HTTPError as e:
+                print(f"Request error: {e} (attempt {attempt + 1}/{self.max_retries})")
+                breaker.record_failure()
+                if attempt < self.max_retries - 1 and self.resilience.budget.try_retry():
+                    await asyncio.sleep(self.resilience.backoff.delay(attempt))
+                    continue
+                return False, None
+
+        return False, None
+
+    async def _refresh_login(self, auth_generation: Optional[int] = None) -> bool:
+        """Re-login with the stored credentials; concurrent callers wait for a single login"""
+        async with self._login_lock:
+            if auth_generation is None:
+                if self.is_session_valid():
+                    return True
+            elif self._auth_generation != auth_generation:
+                return True
+            return await self.login(self.email, self.password)
+
+    async def _coalesced_request(self, method: str, url: str, parse: Callable[[Optional[httpx.Response]], Any],
+                                 **kwargs) -> Any:
+        """Make an idempotent request, sharing one in-flight call between identical concurrent callers"""
+        key = (method, url, json.dumps(kwargs.get('params'), sort_keys=True, default=str),
+               json.dumps(kwargs.get('json'), sort_keys=True, default=str))
+
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            success, response = await self._make_request_with_retry(method, url, **kwargs)
+            result = parse(response if success else None)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unshared failure does not warn about a never-awaited exception
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def is_session_valid(self) -> bool:
+        """Check if session is still valid"""
+        if not self.access_token or not self.last_activity:
+            return False
+
+        # Session expires after 30 minutes of inactivity
+        session_timeout = timedelta(minutes=30)
+        if datetime.now() - self.last_activity > session_timeout:
+            return False
+
+        return True
+
+    async def login(self, email: str, password: str) -> bool:
+        """
+        Authenticate with PerfectGym
+        Returns True if successful, False otherwise
+        """
+        try:
+            login_url = f"{self.base_url}/ClientPortal2/Auth/Login"
+
+            payload = {
+                "RememberMe": False,
+                "Login": email,
+                "Password": password
+            }
+
+            response = await self.http.post(login_url, json=payload)
+
+            if response.status_code == 200:
+                data = response.json()
+                if 'User' in data and 'Member' in data['User']:
+                    member = data['User']['Member']
+                    self.user_id = member.get('Id')
+                    self.email = member.get('Email')
+                    self.password = password  # Store for auto-refresh
+                    self.last_activity = datetime.now()
+                    self._auth_generation += 1
+
+                    # Extract JWT token from cookies
+                    token = self.http.cookies.get('CpAuthToken')
+                    if token:
+                        self.access_token = token
+                        self.http.headers['Authorization'] = f'Bearer {self.access_token}'
+
+                    print(f"Successfully logged in as {member.get('FirstName')} {member.get('LastName')}")
+                    return True
+                else:
+                    print("Login response missing expected user data")
+                    return False
+            else:
+                print(f"Login failed with status code: {response.status_code}")
+                return False
+
+        except Exception as e:
+            print(f"Login error: {e}")
+            return False
+
+    async def _ensure_session(self) -> bool:
+        """Re-login if the session looks expired; returns False if that fails"""
+        if not self.is_session_valid() and self.email and self.password:
+            print("Session expired, refreshing...")
+            return await self._refresh_login()
+        return True
+
+    async def get_schedule(self, date: Optional[datetime] = None, days: int = 7) -> ScheduleResult:
+        """
+        Get badminton court availability schedule
+
+        Args:
+            date: Starting date (defaults to today)
+            days: Number of days to fetch (default 7)
+
+        Returns:
+            List of available Slots (flattened, times pre-parsed; a ScheduleResult carrying
+            fetched_at, age and stale)
+        """
+        try:
+            requested_days = days
+            days = schedule_horizon(date, requested_days)
+
+            cache_key = (self.club_id, self.zone_type_id, days)
+            snapshot = self.schedule_cache.get(cache_key)
+            if snapshot is None:
+                snapshot = await self._fetch_snapshot(cache_key, days)
+            if snapshot is None:
+                return ScheduleResult()
+
+            ttl = self.schedule_cache.ttl
+            if date:
+                return ScheduleResult(snapshot.index.on_date(date, days=requested_days), snapshot.fetched_at, ttl)
+
+            return ScheduleResult(snapshot.slots, snapshot.fetched_at, ttl)
+
+        except Exception as e:
+            print(f"Schedule fetch error: {e}")
+            return ScheduleResult()
+
+    async def _fetch_snapshot(self, cache_key: tuple, days: int) -> Optional[ScheduleSnapshot]:
+        """
+        Fetch a schedule into the shared cache; if PerfectGym fails (or its breaker is open),
+        fall back to the cached copy if it is at most stale_if_error seconds old
+        """
+        slots = None
+        if await self._ensure_session():
+            slots = await self._fetch_schedule_slots(days)
+        else:
+            print("Failed to refresh session")
+
+        if slots is not None:
+            snapshot = ScheduleSnapshot(slots)
+            self.schedule_cache.put(cache_key, snapshot)
+            return snapshot
+
+        # An old schedule beats no schedule (only the in-memory copy: the on-disk store is sync-only)
+        cached = self.schedule_cache.get_stale(cache_key)
+        if cached is not None and cached[1] <= self.stale_if_error:
+            print(f"Serving cached schedule from {cached[1]:.0f}s ago")
+            return cached[0]
+        return None
+
+    async def _fetch_schedule_slots(self, days: int) -> Optional[List[Slot]]:
+        """Fetch and flatten the weekly schedule, or None if the request failed"""
+        schedule_url = f"{self.base_url}/ClientPortal2/FacilityBookings/FacilityCalendar/GetWeeklySchedule"
+
+        payload = {
+            "clubId": self.club_id,
+            "zoneTypeId": str(self.zone_type_id),
+            "zoneId": None,
+            "daysInWeek": days
+        }
+
+        def parse(response: Optional[httpx.Response]) -> Optional[List[Slot]]:
+            if response is None:
+                print("Failed to fetch schedule after retries")
+                return None
+            if response.status_code != 200:
+                print(f"Failed to fetch schedule: {response.status_code}")
+                return None
+            return shared_parse_memo.flatten(response.content)[0]
+
+        return await self._coalesced_request('POST', schedule_url, parse, json=payload)
+
+    async def book_court(self, zone_id: int, start_time: datetime, duration_minutes: int = 30) -> dict:
+        """
+        Book a badminton court using PerfectGym's booking wizard
+
+        Args:
+            zone_id: ID of the specific court (87-98 for courts 1-12)
+            start_time: Start time of booking
+            duration_minutes: Duration in minutes (default 30)
+
+        Returns:
+            dict with success status and booking details, or error info
+        """
+        try:
+            if not await self._ensure_session():
+                return {"success": False, "error": "Session expired. Please login again."}
+
+            # Step 1: Start the booking wizard (GET)
+            start_url = f"{self.base_url}/ClientPortal2/FacilityBookings/BookFacility/Start"
+            start_params = {
+                "clubId": self.club_id,
+                "startDate": start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+                "zoneTypeId": self.zone_type_id,
+                "RedirectUrl": f"{self.base_url}/ClientPortal2/"
+            }
+
+            success, start_response = await self._make_request_with_retry('GET', start_url, params=start_params)
+            if not success or start_response.status_code != 200:
+                return {"success": False, "error": f"Failed to start booking: {start_response.status_code if start_response else 'timeout'}"}
+
+            await asyncio.sleep(self.wizard_step_delay)
+
+            # Step 2: Set booking details (court, time, duration)
+            details_url = f"{self.base_url}/ClientPortal2/FacilityBookings/WizardSteps/SetFacilityBookingDetailsWizardStep/Next"
+            details_payload = {
+                "UserId": self.user_id,
+                "ZoneId": zone_id,
+                "StartTime": start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+                "Duration": duration_minutes,
+                "RequiredNumberOfSlots": None
+            }
+
+            success, details_response = await self._make_request_with_retry('POST', details_url, json=details_payload)
+            if not success or details_response.status_code != 200:
+                error_msg = details_response.text if details_response else "timeout"
+                return {"success": False, "error": f"Failed to set booking details: {error_msg}"}
+
+            details_data = details_response.json()
+            if 'Data' not in details_data or 'RuleId' not in details_data['Data']:
+                return {"success": False, "error": "No booking rule found"}
+
+            rule_id = details_data['Data']['RuleId']
+
+            await asyncio.sleep(self.wizard_step_delay)
+
+            # Step 3: Confirm booking with rule
+            confirm_url = f"{self.base_url}/ClientPortal2/FacilityBookings/WizardSteps/ChooseBookingRuleStep/Next"
+            confirm_payload = {
+                "ruleId": rule_id,
+                "OtherCalendarEventBookedAtRequestedTime": False,
+                "HasUserRequiredProducts": False,
+                "ShouldBuyRequiredProductOnDebit": True
+            }
+
+            success, confirm_response = await self._make_request_with_retry('POST', confirm_url, json=confirm_payload)
+            if not success or confirm_response.status_code != 200:
+                return {"success": False, "error": f"Failed to confirm booking: {confirm_response.status_code if confirm_response else 'timeout'}"}
+
+            confirm_data = confirm_response.json()
+            if 'Data' in confirm_data and 'FacilityBooking' in confirm_data['Data']:
+                booking = confirm_data['Data']['FacilityBooking']
+                return {
+                    "success": True,
+                    "start_time": booking.get('StartDate'),
+                    "duration": booking.get('Duration'),
+                    "user": booking.get('User', {}).get('FirstName', '') + ' ' + booking.get('User', {}).get('LastName', ''),
+                    "message": "Booking confirmed! Check your email for payment instructions."
+                }
+            else:
+                return {"success": False, "error": "Booking confirmation data missing"}
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    async def get_my_bookings(self) -> BookingsResult:
+        """
+        Get user's current bookings
+
+        Returns:
+            List of user's bookings (a BookingsResult; stale if PerfectGym failed and
+            these are the last bookings seen)
+        """
+        try:
+            if not await self._ensure_session():
+                return self._last_bookings.served_stale()
+
+            bookings_url = f"{self.base_url}/Api/FacilityBooking/MyBookings"
+
+            params = {
+                "clubId": self.club_id,
+                "userId": self.user_id
+            }
+
+            def parse(response: Optional[httpx.Response]) -> Optional[List[Dict[str, Any]]]:
+                if response is not None and response.status_code == 200:
+                    return response.json()
+                return None
+
+            bookings = await self._coalesced_request('GET', bookings_url, parse, params=params)
+            if bookings is None:
+                # PerfectGym failed (or its breaker is open): show the last bookings we saw
+                return self._last_bookings.served_stale()
+            self._last_bookings = BookingsResult(bookings)
+            return self._last_bookings
+
+        except Exception as e:
+            print(f"Error fetching bookings: {e}")
+            return []
+
+    async def cancel_booking(self, booking_id: str) -> bool:
+        """
+        Cancel a booking
+
+        Args:
+            booking_id: ID of the booking to cancel
+
+        Returns:
+            True if cancellation successful, False otherwise
+        """
+        try:
+            if not await self._ensure_session():
+                return False
+
+            cancel_url = f"{self.base_url}/Api/FacilityBooking/Cancel"
+
+            payload = {
+                "bookingId": booking_id,
+                "clubId": self.club_id
+            }
+
+            success, response = await self._make_request_with_retry('POST', cancel_url, json=payload)
+
+            return bool(success and response is not None and response.status_code in [200, 204])
+
+        except Exception as e:
+            print(f"Cancellation error: {e}")
+            return False
+
+    async def logout(self) -> None:
+        """Logout and clear session"""
+        try:
+            logout_url = f"{self.base_url}/Api/Users/Logout"
+            await self.http.post(logout_url)
+        except Exception:
+            pass
+        finally:
+            self.access_token = None
+            self.user_id = None
+            self._last_bookings = BookingsResult(stale=True)
+            self.http.headers.pop('Authorization', None)
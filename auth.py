@@ -1,77 +1,292 @@
 """
 User authentication module for the Streamlit app
+
+Users live in a SQLite database (WAL mode) shared by every app process:
+lookups go through the primary key index, so login cost doesn't grow with the
+number of accounts, and every write is a single atomic statement. Accounts
+from the older users.json file are imported on first start.
+
+bcrypt runs on a small shared worker pool rather than in the Streamlit script
+thread, so a burst of logins queues there instead of occupying every core.
+After a login the app gets a signed, expiring session token, so a page
+reload restores the session without another bcrypt round.
 """
+import base64
+import hashlib
+import hmac
 import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
 from pathlib import Path
 from typing import Optional
 
+# Session secrets that would let anyone forge tokens are refused
+SESSION_SECRET_PLACEHOLDER = "your-session-secret-here"
+MIN_SESSION_SECRET_BYTES = 32
+
+_bcrypt_executor: Optional[ThreadPoolExecutor] = None
+_bcrypt_lock = threading.Lock()
+
+
+def _bcrypt_pool() -> ThreadPoolExecutor:
+    """
+    Shared bcrypt worker pool, created on first use (after the app has loaded .env)
+
+    bcrypt releases the GIL while hashing: a few workers bound the CPU a login burst can take.
+    """
+    global _bcrypt_executor
+    with _bcrypt_lock:
+        if _bcrypt_executor is None:
+            _bcrypt_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BCRYPT_WORKERS", "2")),
+                                                  thread_name_prefix="bcrypt")
+        return _bcrypt_executor
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
 
 class UserAuth:
     """Handles user authentication for the Streamlit app"""
 
-    def __init__(self, users_file: str = "users.json"):
-        self.users_file = Path(users_file)
-        self._ensure_users_file()
+    def __init__(self, db_file: Optional[str] = None, legacy_users_file: str = "users.json",
+                 rounds: Optional[int] = None, session_secret: Optional[str] = None,
+                 session_ttl: Optional[float] = None):
+        """
+        Args:
+            db_file: SQLite user database shared by all app processes (defaults to USERS_DB_FILE or users.db)
+            legacy_users_file: JSON user file of earlier versions, imported once if present
+            rounds: bcrypt cost factor for new hashes (defaults to BCRYPT_ROUNDS or 12); older
+                hashes are upgraded to it on the next successful login
+            session_secret: Key signing session tokens (defaults to SESSION_SECRET)
+            session_ttl: Seconds a session token stays valid (defaults to SESSION_TOKEN_TTL or 12 hours)
+
+        Raises:
+            ValueError: If the session secret is the .env.example placeholder or shorter than 32 bytes
+        """
+        self.db_file = Path(db_file or os.getenv("USERS_DB_FILE", "users.db"))
+        self.rounds = rounds or int(os.getenv("BCRYPT_ROUNDS", "12"))
+        self.session_ttl = session_ttl or float(os.getenv("SESSION_TOKEN_TTL", "43200"))
+
+        session_secret = session_secret or os.getenv("SESSION_SECRET")
+        if not session_secret:
+            # Tokens then only survive as long as this process (and only work on this replica)
+            session_secret = secrets.token_urlsafe(32)
+            print("⚠️  No SESSION_SECRET set: login sessions won't survive an app restart")
+        elif session_secret == SESSION_SECRET_PLACEHOLDER:
+            # Anyone could forge session tokens signed with a published key
+            raise ValueError("SESSION_SECRET is still the .env.example placeholder: generate a real one")
+        if len(session_secret.encode()) < MIN_SESSION_SECRET_BYTES:
+            raise ValueError(f"SESSION_SECRET must be at least {MIN_SESSION_SECRET_BYTES} bytes")
+        self._session_key = session_secret.encode()
+
+        self._local = threading.local()
+        self._init_db()
+        self.migrate_json(legacy_users_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the current thread (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Writers wait for each other instead of failing with "database is locked"
+            conn = sqlite3.connect(self.db_file, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        """Create the users table if it doesn't exist"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password_hash TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    session_version INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Databases created before session tokens lack the column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+            if "session_version" not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN session_version INTEGER NOT NULL DEFAULT 0")
+
+    def migrate_json(self, users_file: str) -> int:
+        """
+        Import users from a users.json file of earlier versions
+
+        Existing accounts are never overwritten, so running this again (or from several
+        processes at once) is harmless. The file is renamed to *.migrated afterwards.
+
+        Args:
+            users_file: Path of the JSON file ({username: {"password_hash": ...}})
+
+        Returns:
+            Number of accounts imported
+        """
+        path = Path(users_file)
+        if not path.exists():
+            return 0
+
+        try:
+            with open(path, 'r') as f:
+                users = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"User migration skipped: could not read {path}: {e}")
+            return 0
+
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                [(username, user["password_hash"], now) for username, user in users.items()
+                 if isinstance(user, dict) and user.get("password_hash")]
+            )
+            imported = cursor.rowcount
+
+        try:
+            path.rename(path.with_name(path.name + ".migrated"))
+        except FileNotFoundError:
+            pass  # Another process migrated it first
+        print(f"Imported {imported} users from {path} into {self.db_file}")
+        return imported
+
+    def _password_hash(self, username: str) -> Optional[str]:
+        """Stored bcrypt hash of a user, or None if there is no such user"""
+        row = self._connect().execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _hash(self, password: str) -> str:
+        """bcrypt hash of a password at the configured cost, computed on the bcrypt pool"""
+        return _bcrypt_pool().submit(bcrypt.hashpw, password.encode(), bcrypt.gensalt(self.rounds)).result().decode()
 
-    def _ensure_users_file(self) -> None:
-        """Create users file if it doesn't exist"""
-        if not self.users_file.exists():
-            with open(self.users_file, 'w') as f:
-                json.dump({}, f)
+    @staticmethod
+    def _check(password: str, stored_hash: str) -> bool:
+        """Verify a password against a bcrypt hash on the bcrypt pool"""
+        return _bcrypt_pool().submit(bcrypt.checkpw, password.encode(), stored_hash.encode()).result()
 
-    def _load_users(self) -> dict:
-        """Load users from file"""
+    def _upgrade_hash(self, username: str, password: str, stored_hash: str) -> None:
+        """Re-hash at the configured cost in the background if the stored hash uses another one"""
         try:
-            with open(self.users_file, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+            stored_rounds = int(stored_hash.split("$")[2])
+        except (IndexError, ValueError):
+            return
+        if stored_rounds == self.rounds:
+            return
+
+        def upgrade() -> None:
+            new_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+            with self._connect() as conn:
+                conn.execute("UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                             (new_hash, username, stored_hash))
 
-    def _save_users(self, users: dict) -> None:
-        """Save users to file"""
-        with open(self.users_file, 'w') as f:
-            json.dump(users, f, indent=2)
+        _bcrypt_pool().submit(upgrade)
 
     def register_user(self, username: str, password: str) -> bool:
         """Register a new user"""
-        users = self._load_users()
-
-        if username in users:
+        if self.user_exists(username):
             return False  # User already exists
 
         # Hash the password
-        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-
-        users[username] = {
-            "password_hash": password_hash
-        }
+        password_hash = self._hash(password)
 
-        self._save_users(users)
-        return True
+        # The primary key makes this atomic: of two concurrent registrations, one wins
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                (username, password_hash, time.time())
+            )
+        return cursor.rowcount == 1
 
     def authenticate(self, username: str, password: str) -> bool:
         """Authenticate a user"""
-        users = self._load_users()
-
-        if username not in users:
+        stored_hash = self._password_hash(username)
+        if stored_hash is None:
             return False
 
-        stored_hash = users[username]["password_hash"].encode()
-        return bcrypt.checkpw(password.encode(), stored_hash)
+        if not self._check(password, stored_hash):
+            return False
+        self._upgrade_hash(username, password, stored_hash)
+        return True
 
     def user_exists(self, username: str) -> bool:
         """Check if a user exists"""
-        users = self._load_users()
-        return username in users
+        return self._password_hash(username) is not None
 
     def change_password(self, username: str, old_password: str, new_password: str) -> bool:
         """Change user password"""
-        if not self.authenticate(username, old_password):
+        stored_hash = self._password_hash(username)
+        if stored_hash is None or not self._check(old_password, stored_hash):
             return False
 
-        users = self._load_users()
-        new_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
-        users[username]["password_hash"] = new_hash
-        self._save_users(users)
-        return True
+        new_hash = self._hash(new_password)
+        # Only replace the hash we verified against: a concurrent change wins instead of being lost.
+        # Bumping the session version revokes every session token issued before
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE users SET password_hash = ?, session_version = session_version + 1 "
+                "WHERE username = ? AND password_hash = ?",
+                (new_hash, username, stored_hash)
+            )
+        return cursor.rowcount == 1
+
+    def _session_version(self, username: str) -> Optional[int]:
+        """Current session version of a user, or None if there is no such user"""
+        row = self._connect().execute(
+            "SELECT session_version FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def issue_session_token(self, username: str) -> str:
+        """
+        Signed token that logs the user back in (e.g. after a page reload) until it expires
+
+        Changing the password revokes every token issued before.
+        """
+        payload = json.dumps({
+            "u": username,
+            "exp": int(time.time() + self.session_ttl),
+            "v": self._session_version(username)
+        }, separators=(",", ":")).encode()
+        body = _b64encode(payload)
+        return f"{body}.{self._sign(body)}"
+
+    def verify_session_token(self, token: Optional[str]) -> Optional[str]:
+        """
+        Check a session token (signature, expiry, password unchanged; no bcrypt involved)
+
+        Returns:
+            The username it was issued to, or None if it is invalid or expired
+        """
+        if not token or token.count(".") != 1:
+            return None
+        body, signature = token.split(".")
+        # Compared as bytes: compare_digest rejects non-ASCII str with a TypeError
+        if not hmac.compare_digest(signature.encode(), self._sign(body).encode()):
+            return None
+
+        try:
+            payload = json.loads(_b64decode(body))
+            username, expires, version = payload["u"], payload["exp"], payload["v"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if time.time() >= expires:
+            return None
+
+        if version is None or version != self._session_version(username):
+            return None
+        return username
+
+    def _sign(self, body: str) -> str:
+        return _b64encode(hmac.new(self._session_key, body.encode(), hashlib.sha256).digest())
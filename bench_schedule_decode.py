@@ -0,0 +1,54 @@
+"""
+Benchmark: stdlib json + flatten_schedule vs the fast decoding backends
+
+Decodes and flattens synthetic 7, 30 and 90-day GetWeeklySchedule payloads
+(the same recorded-style documents bench_schedule_parse.py serves) with every
+backend installed here, checks they produce the same slots, and reports the
+best-of-N time per payload and the speedup over the stdlib baseline.
+
+Usage:
+    python bench_schedule_decode.py
+"""
+import json
+import time
+
+from bench_schedule_parse import make_payload
+from schedule_parser import available_json_backends, flatten_schedule, flatten_schedule_body
+
+HORIZONS = [7, 30, 90]
+RUNS = 7
+
+
+def _best_of(fn, runs: int = RUNS) -> float:
+    """Fastest of runs calls, in seconds"""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    backends = available_json_backends()
+    print(f"Backends installed: {', '.join(backends)}")
+    print(f"{'days':>5} {'payload':>10} {'decoder':>22} {'slots':>7} {'time':>9} {'speedup':>8}")
+
+    for days in HORIZONS:
+        body = make_payload(days)
+        expected = flatten_schedule(json.loads(body))
+        baseline = _best_of(lambda: flatten_schedule(json.loads(body)))
+        print(f"{days:>5} {len(body) / 1e6:>8.1f}MB {'json + flatten_schedule':>22} {len(expected):>7} "
+              f"{baseline * 1000:>7.1f}ms {1:>7.2f}x")
+
+        for backend in backends:
+            slots = flatten_schedule_body(body, backend)
+            if slots != expected:
+                raise AssertionError(f"{backend} backend produced different slots for {days} days")
+            elapsed = _best_of(lambda: flatten_schedule_body(body, backend))
+            print(f"{'':>5} {'':>10} {backend:>22} {len(slots):>7} "
+                  f"{elapsed * 1000:>7.1f}ms {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark: full-document vs streaming parsing of GetWeeklySchedule responses
+
+Serves synthetic 30-day and 90-day payloads from a local HTTP server and fetches
+each one in a fresh subprocess, reporting latency and peak RSS growth per mode.
+Peak RSS growth is measured against the high-water mark left by imports, so it
+only shows the parse once it exceeds that; the Python heap peak (tracemalloc,
+measured in a separate run) shows the difference at every size.
+
+Usage:
+    python bench_schedule_parse.py
+"""
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+HORIZONS = [30, 90]
+COURTS = 12
+RUNS = 3
+
+
+def make_payload(days: int, courts: int = COURTS) -> bytes:
+    """Synthetic CalendarData document: one hour block per opening hour, one slot per court and half hour"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    blocks = []
+    slot_id = 0
+    for hour in range(6, 23):
+        per_day = []
+        for day in range(days):
+            day_slots = []
+            for minute in (0, 30):
+                start = today + timedelta(days=day, hours=hour, minutes=minute)
+                for court in range(courts):
+                    slot_id += 1
+                    day_slots.append({
+                        "StartTime": start.strftime('%Y-%m-%dT%H:%M:%S'),
+                        "EndTime": (start + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S'),
+                        "BookingDuration": "PT30M",
+                        "Status": "Bookable" if slot_id % 3 else "Booked",
+                        "Id": slot_id,
+                        "ZoneId": 87 + court,
+                        "Durations": ["PT30M", "PT1H", "PT1H30M"]
+                    })
+            per_day.append(day_slots)
+        blocks.append({"Hour": hour, "ClassesPerDay": per_day})
+    return json.dumps({"CalendarData": blocks}).encode()
+
+
+def serve_payloads() -> ThreadingHTTPServer:
+    """Start a local server answering POSTs with the payload for the requested daysInWeek"""
+    payloads = {days: make_payload(days) for days in HORIZONS}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            days = json.loads(self.rfile.read(length))['daysInWeek']
+            body = payloads[days]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_child(mode: str, base_url: str, days: int, trace: bool) -> None:
+    """Fetch one schedule in this process and print latency / memory figures as JSON"""
+    from perfectgym_client import PerfectGymClient
+
+    client = PerfectGymClient(base_url=base_url)
+    client.stream_schedule = mode == 'stream'
+
+    if trace:
+        tracemalloc.start()
+        client._fetch_schedule_slots(days)
+        print(json.dumps({"heap_peak_kb": tracemalloc.get_traced_memory()[1] / 1024}))
+        return
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    slots = client._fetch_schedule_slots(days)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({"slots": len(slots), "seconds": elapsed, "rss_growth_kb": peak_kb - baseline_kb}))
+
+
+def _child(mode: str, base_url: str, days: int, trace: bool = False) -> dict:
+    args = [sys.executable, __file__, '--child', mode, base_url, str(days)] + (['--trace'] if trace else [])
+    out = subprocess.run(args, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    server = serve_payloads()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{'days':>5} {'mode':>7} {'payload':>10} {'slots':>7} {'latency':>10} {'peak RSS +':>12} {'heap peak':>11}")
+    for days in HORIZONS:
+        payload_mb = len(make_payload(days)) / 1e6
+        for mode in ('full', 'stream'):
+            results = [_child(mode, base_url, days) for _ in range(RUNS)]
+            best = min(results, key=lambda r: r['seconds'])
+            rss_mb = min(r['rss_growth_kb'] for r in results) / 1024
+            heap_mb = _child(mode, base_url, days, trace=True)['heap_peak_kb'] / 1024
+            print(f"{days:>5} {mode:>7} {payload_mb:>8.1f}MB {best['slots']:>7} "
+                  f"{best['seconds'] * 1000:>8.0f}ms {rss_mb:>10.1f}MB {heap_mb:>9.1f}MB")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 5 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3], int(sys.argv[4]), '--trace' in sys.argv)
+    else:
+        main()
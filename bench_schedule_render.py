@@ -0,0 +1,78 @@
+"""
+Benchmark: schedule page rerun time, table layout vs per-slot widget list
+
+Runs view_schedule_page under Streamlit's AppTest harness with synthetic
+schedules of increasing length already fetched (and every day's "Show more"
+expanded, the list layout's worst case) and reports the best rerun time and
+the number of elements each layout renders.
+
+Usage:
+    python bench_schedule_render.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+HORIZONS = [1, 3, 7, 14]
+RUNS = 3
+
+# Page script: a fetched schedule in session state, then the real schedule page
+SCRIPT = """
+import streamlit as st
+import app
+from bench_schedule_parse import make_payload
+from perfectgym_client import PerfectGymClient
+from schedule_cache import ScheduleResult
+from schedule_parser import flatten_schedule_body, group_by_date
+
+if 'schedule_data' not in st.session_state:
+    slots = flatten_schedule_body(make_payload({days}))
+    st.session_state.schedule_data = ScheduleResult(slots)
+    st.session_state.schedule_client = PerfectGymClient()
+    st.session_state.schedule_key = ("bench", {days}, None, None, st.session_state.schedule_data.fetched_at)
+    for day in group_by_date(slots):
+        st.session_state[f"show_more_{{day.strftime('%A, %B %d, %Y')}}"] = True
+app.view_schedule_page()
+"""
+
+
+def _count_elements(node) -> int:
+    children = getattr(node, 'children', None)
+    if not children:
+        return 1
+    return sum(_count_elements(child) for child in children.values())
+
+
+def time_layout(days: int, layout: str) -> tuple:
+    """Best rerun time in seconds and element count of the schedule page in one layout"""
+    at = AppTest.from_string(SCRIPT.format(days=days), default_timeout=600)
+    at.session_state["schedule_layout"] = layout
+    at.run()  # first run pays for imports and building the schedule
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    best = float('inf')
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        at.run()
+        best = min(best, time.perf_counter() - start)
+    return best, _count_elements(at._tree)
+
+
+def main() -> None:
+    # The app creates its users / credentials files in the working directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp())
+
+    print(f"{'days':>5} {'layout':>7} {'elements':>9} {'rerun':>10}")
+    for days in HORIZONS:
+        for layout in ("List", "Table"):
+            seconds, elements = time_layout(days, layout)
+            print(f"{days:>5} {layout:>7} {elements:>9} {seconds * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
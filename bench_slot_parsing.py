@@ -0,0 +1,115 @@
+"""
+Benchmark: datetime parsing per rerun with slot dicts vs pre-parsed Slots
+
+Replays what one schedule page rerun and one chat answer do with a fetched
+schedule (group by day, render the first rows of each day with a booking
+link, format slots for the chat) two ways: the way the app did it with slot
+dicts, re-parsing ISO strings at every use, and with the Slot objects
+get_schedule now returns, whose times were parsed once when the schedule
+was fetched. Reports parse calls and time per rerun.
+
+Usage:
+    python bench_slot_parsing.py
+"""
+import time
+from datetime import datetime
+
+import schedule_parser
+from ai_chat_helper import AIChatHelper
+from bench_schedule_parse import make_payload
+from perfectgym_client import PerfectGymClient
+from schedule_parser import flatten_schedule_body, group_by_date
+
+HORIZONS = [1, 7, 14]
+ROWS_PER_DAY = 10  # what view_schedule_page shows before "Show more"
+CHAT_SLOTS = 8  # what process_chat_message formats
+RUNS = 20
+
+
+class ParseCounter:
+    """Counts calls to a datetime parsing function"""
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.parse(*args)
+
+
+def rerun_with_dicts(slots: list, client: PerfectGymClient, fromisoformat, strptime) -> None:
+    """Schedule page rerun plus chat answer as written against slot dicts"""
+    by_date = {}
+    for slot in slots:
+        date_key = fromisoformat(slot['start_time']).strftime('%A, %B %d, %Y')
+        by_date.setdefault(date_key, []).append(slot)
+    for date_str in sorted(by_date.keys(), key=lambda x: strptime(x, '%A, %B %d, %Y')):
+        for slot in by_date[date_str][:ROWS_PER_DAY]:
+            start_dt = fromisoformat(slot['start_time'])
+            end_dt = fromisoformat(slot['end_time'])
+            f"{start_dt.strftime('%I:%M %p')} - {end_dt.strftime('%I:%M %p')}"
+            client.get_booking_url(start_dt)
+
+    for slot in slots[:CHAT_SLOTS]:
+        start_dt = fromisoformat(slot['start_time'])
+        end_dt = fromisoformat(slot['end_time'])
+        f"{start_dt.strftime('%I:%M %p')} - {end_dt.strftime('%I:%M %p')}"
+    client.get_booking_url(fromisoformat(slots[0]['start_time']))
+
+
+def rerun_with_slots(slots: list, client: PerfectGymClient, helper: AIChatHelper) -> None:
+    """The same rerun using the app's Slot-based helpers"""
+    for day, day_slots in group_by_date(slots).items():
+        day.strftime('%A, %B %d, %Y')
+        for slot in day_slots[:ROWS_PER_DAY]:
+            f"{slot.start.strftime('%I:%M %p')} - {slot.end.strftime('%I:%M %p')}"
+            client.get_booking_url(slot.start)
+
+    helper.format_slots_for_chat(slots, max_slots=CHAT_SLOTS)
+    client.get_booking_url(slots[0].start)
+
+
+def _best_of(fn, runs: int = RUNS) -> float:
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    client = PerfectGymClient()
+    helper = AIChatHelper()
+
+    # Count Slot parsing too: anything it does per rerun would show up here
+    slot_parse = ParseCounter(schedule_parser._parse_time)
+    schedule_parser._parse_time = slot_parse
+
+    print(f"{'days':>5} {'slots':>7} {'fetch parses':>13} {'dict parses/rerun':>18} {'Slot parses/rerun':>18} "
+          f"{'dict rerun':>11} {'Slot rerun':>11}")
+    for days in HORIZONS:
+        body = make_payload(days)
+        slot_parse.calls = 0
+        slots = flatten_schedule_body(body)
+        fetch_parses = slot_parse.calls
+        dict_slots = [slot.to_dict() for slot in slots]
+
+        fromisoformat = ParseCounter(datetime.fromisoformat)
+        strptime = ParseCounter(datetime.strptime)
+        rerun_with_dicts(dict_slots, client, fromisoformat, strptime)
+        dict_parses = fromisoformat.calls + strptime.calls
+
+        slot_parse.calls = 0
+        rerun_with_slots(slots, client, helper)
+        slot_parses = slot_parse.calls
+
+        dict_time = _best_of(lambda: rerun_with_dicts(dict_slots, client, datetime.fromisoformat, datetime.strptime))
+        slot_time = _best_of(lambda: rerun_with_slots(slots, client, helper))
+        print(f"{days:>5} {len(slots):>7} {fetch_parses:>13} {dict_parses:>18} {slot_parses:>18} "
+              f"{dict_time * 1000:>9.2f}ms {slot_time * 1000:>9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
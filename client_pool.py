@@ -0,0 +1,202 @@
+"""
+Process-wide pool of authenticated PerfectGym clients
+
+One logged-in PerfectGymClient per PerfectGym account, shared by every
+Streamlit session (browser tabs, reruns) using that account, so they share a
+login and a connection pool instead of each logging in on its own.
+
+Sessions hold leases on a client. Streamlit has no hook for a closed tab, so a
+lease that hasn't been used for idle_timeout seconds lapses on its own; a
+client without live leases is logged out and dropped once it has been idle
+that long, or earlier when the pool is at max_clients and needs the room.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from perfectgym_client import PerfectGymClient
+
+
+class _PooledClient:
+    """A pooled client plus its leases and the (keyed) digest of its password"""
+
+    def __init__(self, client: PerfectGymClient, password_digest: bytes):
+        self.client = client
+        self.password_digest = password_digest
+        self.leases: Dict[str, float] = {}  # lease id -> last used (epoch seconds)
+        self.last_used = time.time()
+        self.lock = threading.Lock()  # serializes logins for this account
+
+
+class ClientPool:
+    """Credential-keyed, reference-counted pool of logged-in clients with idle eviction"""
+
+    def __init__(self, max_clients: int = 32, idle_timeout: float = 1800.0,
+                 client_factory: Callable[[], PerfectGymClient] = PerfectGymClient):
+        """
+        Args:
+            max_clients: Maximum number of live (logged-in) clients
+            idle_timeout: Seconds after which an unused lease lapses and an unleased client is evicted
+            client_factory: Creates new clients (e.g. with a different base URL)
+        """
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.client_factory = client_factory
+        self._entries: Dict[str, _PooledClient] = {}
+        self._lock = threading.Lock()
+        # Passwords are only compared, never stored: keep a digest under a per-process key
+        self._digest_key = secrets.token_bytes(32)
+        self.logins = 0
+        self.reuses = 0
+
+    def acquire(self, email: str, password: str, lease_id: str) -> Optional[PerfectGymClient]:
+        """
+        Get the logged-in client for an account, logging in only if no valid session exists
+
+        Args:
+            email: PerfectGym account email (the pool key)
+            password: PerfectGym account password
+            lease_id: Identifies the caller (e.g. one per Streamlit session); acquiring
+                again with the same id just renews the lease
+
+        Returns:
+            The shared client, or None if the pool is full or the login failed
+        """
+        key = email.strip().lower()
+        digest = self._digest(password)
+        retired = []
+
+        with self._lock:
+            retired.extend(self._evict_idle())
+            entry = self._entries.get(key)
+            other_password = entry is not None and not hmac.compare_digest(entry.password_digest, digest)
+
+            if entry is None:
+                if len(self._entries) >= self.max_clients:
+                    victim = self._least_recently_used_unleased()
+                    if victim is None:
+                        self._logout(retired)
+                        print(f"Client pool full ({self.max_clients} live sessions)")
+                        return None
+                    retired.append(self._entries.pop(victim))
+                entry = _PooledClient(self.client_factory(), digest)
+                self._entries[key] = entry
+
+            if not other_password:
+                now = time.time()
+                entry.leases[lease_id] = now
+                entry.last_used = now
+
+        self._logout(retired)
+
+        if other_password:
+            return self._replace(key, email, password, digest, lease_id)
+
+        # Concurrent first requests for the same account share one login
+        with entry.lock:
+            if entry.client.is_session_valid():
+                self.reuses += 1
+                return entry.client
+            self.logins += 1
+            if entry.client.login(email, password):
+                return entry.client
+
+        self.release(email, lease_id)
+        with self._lock:
+            if self._entries.get(key) is entry and not entry.leases:
+                del self._entries[key]
+        return None
+
+    def _replace(self, key: str, email: str, password: str, digest: bytes,
+                 lease_id: str) -> Optional[PerfectGymClient]:
+        """
+        Log in with a password other than the pooled client's, swapping the client only if that works
+
+        A wrong password must not tear down the live session every other tab of the
+        account is leasing, so the login happens on a separate client first.
+        """
+        client = self.client_factory()
+        self.logins += 1
+        if not client.login(email, password):
+            client.session.close()
+            return None
+
+        candidate = _PooledClient(client, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and hmac.compare_digest(entry.password_digest, digest)
+                    and entry.client.is_session_valid()):
+                # Another session swapped in a live client for this password first: share it
+                retired = [candidate]
+            else:
+                # The password changed: the old session belongs to the old credentials
+                retired = [entry] if entry is not None else []
+                entry = self._entries[key] = candidate
+            now = time.time()
+            entry.leases[lease_id] = now
+            entry.last_used = now
+
+        self._logout(retired)
+        return entry.client
+
+    def release(self, email: str, lease_id: str) -> None:
+        """Drop a lease (e.g. on app logout); the client stays pooled until it idles out"""
+        with self._lock:
+            entry = self._entries.get(email.strip().lower())
+            if entry is not None:
+                entry.leases.pop(lease_id, None)
+
+    def evict(self, email: str) -> None:
+        """Log out and drop an account's client regardless of leases (e.g. credentials removed)"""
+        with self._lock:
+            entry = self._entries.pop(email.strip().lower(), None)
+        if entry is not None:
+            self._logout([entry])
+
+    def stats(self) -> Dict[str, int]:
+        """Live clients, live leases and login / reuse counters"""
+        with self._lock:
+            return {
+                "clients": len(self._entries),
+                "leases": sum(len(entry.leases) for entry in self._entries.values()),
+                "logins": self.logins,
+                "reuses": self.reuses
+            }
+
+    def _digest(self, password: str) -> bytes:
+        return hmac.new(self._digest_key, password.encode('utf-8'), hashlib.sha256).digest()
+
+    def _evict_idle(self) -> list:
+        """Lapse stale leases and remove idle unleased clients (caller holds the lock)"""
+        cutoff = time.time() - self.idle_timeout
+        evicted = []
+        for key, entry in list(self._entries.items()):
+            for lease_id, last_used in list(entry.leases.items()):
+                if last_used < cutoff:
+                    del entry.leases[lease_id]
+            if not entry.leases and entry.last_used < cutoff:
+                evicted.append(self._entries.pop(key))
+        return evicted
+
+    def _least_recently_used_unleased(self) -> Optional[str]:
+        """Key of the least recently used client without leases (caller holds the lock)"""
+        unleased = [(entry.last_used, key) for key, entry in self._entries.items() if not entry.leases]
+        return min(unleased)[1] if unleased else None
+
+    @staticmethod
+    def _logout(entries: list) -> None:
+        """Log out evicted clients (outside the pool lock: this is a network call)"""
+        for entry in entries:
+            entry.client.logout()
+            entry.client.session.close()
+
+
+# Shared by every Streamlit session in this process
+shared_client_pool = ClientPool(
+    max_clients=int(os.getenv("CLIENT_POOL_MAX_SESSIONS", "32")),
+    idle_timeout=float(os.getenv("CLIENT_POOL_IDLE_TIMEOUT", "1800"))
+)
@@ -0,0 +1,148 @@
+"""
+Hedged requests for idempotent reads
+
+If a read hasn't answered after an adaptive delay (the endpoint's recent p95
+latency), a second identical request is sent and whichever answers first
+wins. Hedges draw from a budget capping the extra load they may add. requests
+can't abort a call that is already on the wire, so the losing attempt is
+abandoned: it runs to completion in the background and its result is dropped.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+
+from resilience import RetryBudget
+
+
+class LatencyTracker:
+    """Recent latencies of one endpoint, for percentile estimates"""
+
+    def __init__(self, samples: int = 200):
+        self._latencies = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """p-th percentile (0-100) of the recorded latencies, or None without samples"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+
+class HedgingPolicy:
+    """Adaptive hedge delays per endpoint, a cap on hedge load and hedge counters"""
+
+    def __init__(self, percentile: float = 95.0, max_extra_load: float = 0.1, min_samples: int = 20,
+                 initial_delay: float = 1.0, min_delay: float = 0.05, max_workers: int = 32):
+        """
+        Args:
+            percentile: Latency percentile after which a hedge is sent
+            max_extra_load: Hedges allowed per request (e.g. 0.1 = at most 10% extra requests)
+            min_samples: Latency samples needed before the percentile is trusted
+            initial_delay: Hedge delay in seconds until then
+            min_delay: Lower bound on the hedge delay in seconds
+            max_workers: Threads running hedged attempts
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        # Hedges are extra attempts on top of first ones, just like retries
+        self.budget = RetryBudget(ratio=max_extra_load, min_retries=1, window=60.0)
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.hedged = 0  # hedges sent
+        self.hedge_wins = 0  # hedges that answered first
+
+    def tracker(self, endpoint: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._trackers.get(endpoint)
+            if tracker is None:
+                tracker = self._trackers[endpoint] = LatencyTracker()
+            return tracker
+
+    def delay(self, endpoint: str) -> float:
+        """Seconds to wait for the first attempt before hedging"""
+        tracker = self.tracker(endpoint)
+        if len(tracker) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, tracker.percentile(self.percentile))
+
+    def call(self, endpoint: str, fn: Callable[[], Any], ok: Callable[[Any], bool] = lambda result: result is not None) -> Any:
+        """
+        Run fn, hedging with a second call if the first is slower than the endpoint's usual
+
+        Args:
+            endpoint: Groups latencies (e.g. the URL path)
+            fn: Zero-argument idempotent call
+            ok: Whether a result counts as an answer; a failed first answer waits for the other attempt
+
+        Returns:
+            The first acceptable result, or the last result if neither attempt succeeded
+        """
+        tracker = self.tracker(endpoint)
+        self.budget.record_request()
+
+        def attempt() -> Any:
+            start = time.perf_counter()
+            try:
+                return fn()
+            finally:
+                tracker.record(time.perf_counter() - start)
+
+        pending = {self._executor.submit(attempt)}
+        done, pending = wait(pending, timeout=self.delay(endpoint))
+        if not done and self.budget.try_retry():
+            with self._lock:
+                self.hedged += 1
+            hedge = self._executor.submit(attempt)
+            pending.add(hedge)
+        else:
+            hedge = None
+
+        result = None
+        while pending or done:
+            for future in done:
+                result = future.result()
+                if ok(result):
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    for loser in pending:
+                        loser.cancel()  # only stops an attempt that hasn't started yet
+                    return result
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hedges sent and won, and the current hedge delay per endpoint"""
+        with self._lock:
+            endpoints = list(self._trackers)
+        return {
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "refused": self.budget.exhausted,
+            "delays": {endpoint: self.delay(endpoint) for endpoint in endpoints}
+        }
+
+
+# Shared by every client in the process so the latency history and load cap see all traffic
+shared_hedging = HedgingPolicy(
+    percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+    max_extra_load=float(os.getenv("HEDGE_MAX_EXTRA_LOAD", "0.1"))
+)
@@ -1,64 +1,207 @@
 """
 PerfectGym API Client for interacting with the badminton booking website
 """
+import base64
+import json
+import os
+import sqlite3
+import threading
 import requests
 import uuid
 import time
-from typing import Optional, List, Dict, Any, Tuple
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, Callable, Union
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta, date as date_type
+from urllib.parse import urlsplit
+from schedule_cache import shared_schedule_cache, ScheduleSnapshot, ScheduleResult, warm_horizon
+from schedule_store import shared_schedule_store
+from single_flight import SingleFlight
+from resilience import shared_resilience
+from hedging import shared_hedging
+from transport import mount_transport
+from schedule_parser import Slot, schedule_horizon, flatten_schedule_stream, shared_parse_memo, ijson
+from slot_index import SlotIndex
+from slot_table import SlotTable
+
+# Identical idempotent reads are coalesced across every client in the process
+_read_flight = SingleFlight()
+
+# Deadline-bounded schedule fetches (which may outlive their deadline)
+_background = ThreadPoolExecutor(max_workers=4, thread_name_prefix="schedule-refresh")
+# Stale-while-revalidate refreshes get their own workers, so a burst of them never delays a
+# deadline-bounded read; at most one runs per cache key, which bounds their queue
+_revalidation = ThreadPoolExecutor(max_workers=2, thread_name_prefix="schedule-revalidate")
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+DEFAULT_BASE_URL = "https://statesportcentres.perfectgym.com.au"
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'X-Requested-With': 'XMLHttpRequest',
+    'cp-lang': 'en',
+    'cp-mode': 'desktop'
+}
+
+
+def _jwt_expiry(token: str) -> Optional[float]:
+    """Expiry (epoch seconds) from a JWT's exp claim, or None if it has none (signature is not checked)"""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class BookingsResult(list):
+    """Bookings returned by get_my_bookings, marked stale when they are the last ones seen because PerfectGym failed"""
+
+    def __init__(self, bookings: List[Dict[str, Any]] = (), fetched_at: Optional[float] = None, stale: bool = False):
+        """
+        Args:
+            bookings: The bookings
+            fetched_at: Epoch seconds when they were fetched from PerfectGym
+            stale: PerfectGym failed (or its breaker is open) and these are from an earlier read
+        """
+        super().__init__(bookings)
+        self.fetched_at = fetched_at or time.time()
+        self.stale = stale
+
+    @property
+    def age(self) -> float:
+        """Seconds since the bookings were fetched from PerfectGym"""
+        return time.time() - self.fetched_at
+
+    def served_stale(self) -> "BookingsResult":
+        """The same bookings, flagged as served in place of a failed read"""
+        return BookingsResult(self, self.fetched_at, stale=True)
 
 
 class PerfectGymClient:
     """Client for PerfectGym API"""
 
-    def __init__(self):
-        self.base_url = "https://statesportcentres.perfectgym.com.au"
+    def __init__(self, base_url: str = DEFAULT_BASE_URL):
+        self.base_url = base_url
         self.club_id = 1  # From the URL
         self.zone_type_id = 28  # From the URL (badminton courts)
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'X-Requested-With': 'XMLHttpRequest',
-            'cp-lang': 'en',
-            'cp-mode': 'desktop'
-        })
+        self.session.headers.update(DEFAULT_HEADERS)
+        # Sized, keep-alive tuned connection pool with per-endpoint transfer counters
+        self.transport = mount_transport(self.session)
         self.access_token = None
         self.user_id = None
         self.email = None
         self.password = None  # Store for auto-refresh
         self.last_activity = None
+        # Last request made for a caller; unlike last_activity, token refresh logins leave it alone
+        self.last_used: Optional[datetime] = None
+        self.token_expires_at = None  # epoch seconds, from the CpAuthToken exp claim
+        self._last_bookings = BookingsResult(stale=True)  # served (flagged stale) while MyBookings is failing
+
+        # Renew the token refresh_margin seconds before it expires, in the background, as
+        # long as a request was made within refresh_idle_limit seconds
+        self.auto_refresh = os.getenv("AUTO_REFRESH_SESSION", "true").lower() in ("1", "true", "yes")
+        self.refresh_margin = float(os.getenv("TOKEN_REFRESH_MARGIN", "120"))
+        self.refresh_idle_limit = float(os.getenv("TOKEN_REFRESH_IDLE_LIMIT", "1800"))
+        self._refresh_timer: Optional[threading.Timer] = None
+
+        # Bumped on every successful login (and logout) so concurrent 401s trigger a single
+        # re-login and stale refresh timers stand down
+        self._auth_generation = 0
+        self._login_flight = SingleFlight()
 
         # Timeout and retry settings
         self.timeout = 30  # seconds
         self.max_retries = 3
-        self.retry_delay = 1  # seconds
 
-    def _make_request_with_retry(self, method: str, url: str, **kwargs) -> Tuple[bool, Optional[requests.Response]]:
+        # Backoff, retry budget and per-endpoint circuit breakers, shared by every client
+        self.resilience = shared_resilience
+
+        # Hedge idempotent reads (schedule, my bookings): if one is slower than the endpoint's
+        # recent p95, send a second identical request and take whichever answers first
+        self.hedge_requests = os.getenv("HEDGE_REQUESTS", "").lower() in ("1", "true", "yes")
+        self.hedging = shared_hedging
+
+        # Booking wizard pacing: pause between wizard steps (mimics human interaction)
+        self.wizard_step_delay = float(os.getenv("BOOKING_STEP_DELAY", "0.5"))  # seconds
+        # Cookies that carry authentication; isolated wizard sessions copy only these
+        self.auth_cookie_names = ('CpAuthToken',)
+
+        # Parse GetWeeklySchedule bodies incrementally instead of decoding the whole document
+        self.stream_schedule = os.getenv("STREAM_SCHEDULE_PARSE", "").lower() in ("1", "true", "yes")
+
+        # Windowed schedule fetching. GetWeeklySchedule always starts at the current server
+        # time unless it is told where to start; set SCHEDULE_START_DATE_PARAM to the payload
+        # field that does so (as seen in the browser's network tab) to fetch only the requested
+        # days, split into chunks of schedule_window_days fetched in parallel.
+        self.schedule_start_date_param = os.getenv("SCHEDULE_START_DATE_PARAM") or None
+        self.schedule_window_days = int(os.getenv("SCHEDULE_WINDOW_DAYS", "7"))
+        self.max_parallel_fetches = 4
+
+        # Schedules are shared across all clients in the process, and across processes on disk
+        self.schedule_cache = shared_schedule_cache
+        self.schedule_store = shared_schedule_store
+        # Fingerprints of recent schedule bodies (and days) so unchanged ones aren't parsed again
+        self.parse_memo = shared_parse_memo
+        # Past the cache TTL (soft) but within stale_ttl (hard), a cached schedule is served at
+        # once and refreshed in the background. When PerfectGym fails or misses a caller's
+        # deadline, cached schedules up to stale_if_error seconds old are served instead.
+        self.stale_ttl = float(os.getenv("SCHEDULE_STALE_TTL", "600"))
+        self.stale_if_error = float(os.getenv("SCHEDULE_STALE_IF_ERROR", "3600"))
+
+    def _make_request_with_retry(self, method: str, url: str, session: Optional[requests.Session] = None,
+                                 **kwargs) -> Tuple[bool, Optional[requests.Response]]:
         """
         Make HTTP request with retry logic and timeout handling
 
+        Args:
+            session: Session to send on (defaults to the client's own; booking wizards use isolated ones)
+
         Returns:
             Tuple of (success: bool, response: Optional[Response])
         """
+        session = session or self.session
+        endpoint = urlsplit(url).path
+        breaker = self.resilience.breaker(endpoint)
+        self.resilience.budget.record_request()
+
         for attempt in range(self.max_retries):
+            # Fail fast while the endpoint keeps failing; callers fall back to cached data
+            if not breaker.allow_request():
+                print(f"Circuit open for {endpoint}, not sending request")
+                self.resilience.record_rejected(endpoint)
+                return False, None
+
             try:
                 # Add timeout to all requests
                 kwargs.setdefault('timeout', self.timeout)
+                auth_generation = self._auth_generation
 
-                response = self.session.request(method, url, **kwargs)
+                response = session.request(method, url, **kwargs)
 
                 # Update last activity time
                 self.last_activity = datetime.now()
+                self.last_used = self.last_activity
+
+                # Server errors and throttling count against the endpoint; anything else means it's up
+                if response.status_code >= 500 or response.status_code == 429:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
 
                 # Check for session expiration (401 or 403)
                 if response.status_code in [401, 403]:
                     # Try to refresh session
                     if self.email and self.password and attempt < self.max_retries - 1:
                         print(f"Session expired, attempting to re-login... (attempt {attempt + 1})")
-                        if self.login(self.email, self.password):
-                            # Retry the request after re-login
+                        if self._refresh_login(auth_generation):
+                            if session is not self.session:
+                                self._copy_auth(session)
+                            # Release the rejected response's connection (a streamed body is never
+                            # read, so nothing else would) before retrying after re-login
+                            response.close()
                             continue
                     return False, response
 
@@ -66,25 +209,84 @@ class PerfectGymClient:
 
             except requests.exceptions.Timeout:
                 print(f"Request timeout (attempt {attempt + 1}/{self.max_retries})")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))  # Exponential backoff
+                breaker.record_failure()
+                if attempt < self.max_retries - 1 and self.resilience.budget.try_retry():
+                    time.sleep(self.resilience.backoff.delay(attempt))  # Full-jitter exponential backoff
                     continue
                 return False, None
 
             except requests.exceptions.RequestException as e:
                 print(f"Request error: {e} (attempt {attempt + 1}/{self.max_retries})")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))
+                breaker.record_failure()
+                if attempt < self.max_retries - 1 and self.resilience.budget.try_retry():
+                    time.sleep(self.resilience.backoff.delay(attempt))
                     continue
                 return False, None
 
         return False, None
 
+    def _refresh_login(self, auth_generation: Optional[int] = None) -> bool:
+        """
+        Re-login with the stored credentials, coalescing concurrent attempts
+
+        Args:
+            auth_generation: Login generation the caller saw before its request failed.
+                If another thread has logged in since then, no new login is made.
+                When omitted, the login is skipped if the session has become valid meanwhile.
+
+        Returns:
+            True if the session is (now) authenticated
+        """
+        def relogin() -> bool:
+            if auth_generation is None:
+                if self.is_session_valid():
+                    return True
+            elif self._auth_generation != auth_generation:
+                return True
+            return self.login(self.email, self.password)
+
+        return self._login_flight.do(self.email, relogin)
+
+    def _coalesced_request(self, method: str, url: str, parse: Callable[[requests.Response], Any],
+                           **kwargs) -> Any:
+        """
+        Make an idempotent request, sharing one in-flight call between identical concurrent callers
+
+        Args:
+            method: HTTP method
+            url: Endpoint URL
+            parse: Turns the response into the shared result; receives None if the request failed
+            **kwargs: Passed to the request (params/json make up the coalescing key)
+
+        Returns:
+            The parsed result of the single in-flight request
+        """
+        key = (method, url, json.dumps(kwargs.get('params'), sort_keys=True, default=str),
+               json.dumps(kwargs.get('json'), sort_keys=True, default=str))
+
+        def call():
+            success, response = self._make_request_with_retry(method, url, **kwargs)
+            if not success:
+                # A final 401/403 still carries its response: release a streamed connection
+                if response is not None:
+                    response.close()
+                return parse(None)
+            return parse(response)
+
+        if self.hedge_requests:
+            endpoint = urlsplit(url).path
+            return _read_flight.do(key, lambda: self.hedging.call(endpoint, call))
+        return _read_flight.do(key, call)
+
     def is_session_valid(self) -> bool:
         """Check if session is still valid"""
         if not self.access_token or not self.last_activity:
             return False
 
+        # Trust the token's own expiry when it has one (a few seconds early, for clock skew)
+        if self.token_expires_at is not None:
+            return time.time() < self.token_expires_at - 5
+
         # Session expires after 30 minutes of inactivity
         session_timeout = timedelta(minutes=30)
         if datetime.now() - self.last_activity > session_timeout:
@@ -117,14 +319,17 @@ class PerfectGymClient:
                     self.email = member.get('Email')
                     self.password = password  # Store for auto-refresh
                     self.last_activity = datetime.now()
+                    self._auth_generation += 1
 
                     # Extract JWT token from cookies
                     if 'CpAuthToken' in self.session.cookies:
                         self.access_token = self.session.cookies['CpAuthToken']
+                        self.token_expires_at = _jwt_expiry(self.access_token)
                         # Add Authorization header for subsequent requests
                         self.session.headers.update({
                             'Authorization': f'Bearer {self.access_token}'
                         })
+                        self._schedule_token_refresh()
 
                     print(f"Successfully logged in as {member.get('FirstName')} {member.get('LastName')}")
                     return True
@@ -139,103 +344,508 @@ class PerfectGymClient:
             print(f"Login error: {e}")
             return False
 
-    def get_schedule(self, date: Optional[datetime] = None, days: int = 7) -> List[Dict[str, Any]]:
+    def _schedule_token_refresh(self, delay: Optional[float] = None) -> None:
+        """
+        Start a timer that renews the token shortly before it expires
+
+        Args:
+            delay: Seconds until the refresh (defaults to refresh_margin before expiry)
+        """
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if not self.auto_refresh or self.token_expires_at is None:
+            return
+
+        if delay is None:
+            delay = self.token_expires_at - self.refresh_margin - time.time()
+        timer = threading.Timer(max(delay, 1.0), self._proactive_refresh, args=(self._auth_generation,))
+        timer.daemon = True
+        self._refresh_timer = timer
+        timer.start()
+
+    def _proactive_refresh(self, auth_generation: int) -> None:
+        """Timer callback: log in again before the token expires, unless the client is idle"""
+        if self._auth_generation != auth_generation or not (self.email and self.password):
+            return  # Someone logged in (or out) since this timer was set
+
+        # Measured from last_used: last_activity moves with every refresh login, which would
+        # keep an abandoned client refreshing forever
+        if not self.last_used or (datetime.now() - self.last_used).total_seconds() > self.refresh_idle_limit:
+            print("Client idle, letting the session token expire")
+            return
+
+        try:
+            if self._refresh_login(auth_generation):
+                return
+        except Exception as e:
+            print(f"Token refresh error: {e}")
+
+        # Failed: try again while the current token is still good
+        if self.token_expires_at and time.time() < self.token_expires_at - 30:
+            print("Token refresh failed, retrying in 30s")
+            self._schedule_token_refresh(delay=30)
+
+    def get_schedule(self, date: Optional[datetime] = None, days: int = 7, as_table: bool = False,
+                     deadline: Optional[float] = None) -> Union[ScheduleResult, SlotTable]:
         """
         Get badminton court availability schedule
 
         Args:
             date: Starting date (defaults to today). If provided, will fetch schedule for the week containing this date
             days: Number of days to fetch (default 7)
+            as_table: Return a columnar SlotTable instead of a list of Slots
+            deadline: Seconds to wait for PerfectGym before returning an older cached copy instead
 
         Returns:
-            List of available time slots (flattened)
+            List of available Slots (flattened, times pre-parsed; a ScheduleResult carrying
+            fetched_at, and age and stale computed when read), or a SlotTable if as_table is set
         """
         try:
-            # Validate session before making request
-            if not self.is_session_valid() and self.email and self.password:
-                print("Session expired, refreshing...")
-                if not self.login(self.email, self.password):
-                    print("Failed to refresh session")
-                    return []
+            requested_days = days  # Store the originally requested number of days
+            snapshot, window_start = self._get_window_snapshot(date, requested_days, deadline=deadline)
+            if snapshot is None:
+                return SlotTable.empty() if as_table else ScheduleResult()
 
-            schedule_url = f"{self.base_url}/ClientPortal2/FacilityBookings/FacilityCalendar/GetWeeklySchedule"
+            if as_table:
+                if window_start:
+                    return snapshot.table.on_dates(window_start, requested_days)
+                return snapshot.table
 
-            # If a specific date is requested, ensure we fetch enough days to include it
-            # The API returns schedule starting from current server time
-            requested_days = days  # Store the originally requested number of days
-            if date:
-                now = datetime.now()
-                days_until_target = (date.date() - now.date()).days
-                # Fetch enough days to reach the target date PLUS the requested number of days
-                if days_until_target > 0:
-                    days = days_until_target + requested_days
+            slots = snapshot.slots
 
-            payload = {
-                "clubId": self.club_id,
-                "zoneTypeId": str(self.zone_type_id),
-                "zoneId": None,
-                "daysInWeek": days
-            }
+            # Filter by date range if provided
+            if window_start:
+                filtered_slots = snapshot.index.on_date(window_start, days=requested_days)
+                print(f"DEBUG: Found {len(filtered_slots)} slots in date range")
+                return ScheduleResult(filtered_slots, snapshot.fetched_at, self.schedule_cache.ttl)
 
-            success, response = self._make_request_with_retry('POST', schedule_url, json=payload)
+            return ScheduleResult(slots, snapshot.fetched_at, self.schedule_cache.ttl)
 
-            if not success or not response:
-                print("Failed to fetch schedule after retries")
-                return []
+        except Exception as e:
+            print(f"Schedule fetch error: {e}")
+            return SlotTable.empty() if as_table else ScheduleResult()
 
-            if response.status_code == 200:
-                data = response.json()
-                # Flatten the nested structure into a simple list of slots
-                slots = []
-
-                if 'CalendarData' in data:
-                    for hour_block in data['CalendarData']:
-                        # Each hour_block has ClassesPerDay which is an array of days
-                        for day_index, day_slots in enumerate(hour_block.get('ClassesPerDay', [])):
-                            for slot in day_slots:
-                                # Only include bookable slots
-                                if slot.get('Status') == 'Bookable':
-                                    slots.append({
-                                        'start_time': slot.get('StartTime'),
-                                        'end_time': slot.get('EndTime'),
-                                        'duration': slot.get('BookingDuration'),
-                                        'status': slot.get('Status'),
-                                        'id': slot.get('Id'),
-                                        'available_durations': slot.get('Durations', [])
-                                    })
-
-                # Sort by start time
-                slots.sort(key=lambda x: x['start_time'])
-
-                # Debug: Print date range of fetched slots
-                if slots:
-                    print(f"DEBUG: Fetched {len(slots)} total slots")
-                    print(f"DEBUG: First slot: {slots[0]['start_time']}")
-                    print(f"DEBUG: Last slot: {slots[-1]['start_time']}")
-
-                # Filter by date range if provided
-                if date:
-                    # Create date range: from selected date to selected date + requested_days
-                    end_date = date + timedelta(days=requested_days)
-                    print(f"DEBUG: Filtering for date range: {date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-
-                    filtered_slots = []
-                    for s in slots:
-                        slot_date = datetime.fromisoformat(s['start_time']).date()
-                        if date.date() <= slot_date < end_date.date():
-                            filtered_slots.append(s)
-
-                    print(f"DEBUG: Found {len(filtered_slots)} slots in date range")
-                    return filtered_slots
-
-                return slots
-            else:
-                print(f"Failed to fetch schedule: {response.status_code}")
-                return []
+    def get_schedule_multi(self, targets: List[Tuple[int, int]], date: Optional[datetime] = None, days: int = 7,
+                           max_workers: int = 4, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get availability for several clubs / zone types at once
+
+        Targets are fetched concurrently (at most max_workers at a time), so total
+        latency is close to the slowest single target rather than the sum.
 
+        Args:
+            targets: List of (club_id, zone_type_id) pairs
+            date: Starting date (defaults to today)
+            days: Number of days to fetch (default 7)
+            max_workers: Maximum number of targets fetched in parallel
+            timeout: Seconds to wait for each target before giving up on it (defaults to self.timeout)
+
+        Returns:
+            dict with "slots" (merged, sorted by start time, each tagged with club_id and
+            zone_type_id) and "failed" (list of (club_id, zone_type_id, reason))
+        """
+        timeout = timeout if timeout is not None else self.timeout
+
+        # Validate session once up front rather than in every worker
+        if not self.is_session_valid() and self.email and self.password:
+            print("Session expired, refreshing...")
+            self._refresh_login()
+
+        started = {}  # target position -> monotonic time its worker started
+
+        def fetch(position: int, target: Tuple[int, int]) -> List[Slot]:
+            started[position] = time.monotonic()
+            club_id, zone_type_id = target
+            snapshot, window_start = self._get_window_snapshot(date, days, club_id, zone_type_id)
+            if snapshot is None:
+                raise RuntimeError("schedule fetch failed")
+            slots = snapshot.index.on_date(window_start, days=days) if window_start else snapshot.slots
+            # Cached Slots are shared, so tag copies
+            return [slot.tagged(club_id, zone_type_id) for slot in slots]
+
+        merged = []
+        failed = []
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets))))
+        try:
+            pending = {executor.submit(fetch, position, target): position for position, target in enumerate(targets)}
+            while pending:
+                # Each target gets `timeout` seconds from when its worker actually started
+                now = time.monotonic()
+                for future, position in list(pending.items()):
+                    if position in started and now - started[position] >= timeout and not future.done():
+                        failed.append(tuple(targets[position]) + (f"timed out after {timeout}s",))
+                        del pending[future]
+                if not pending:
+                    break
+
+                deadlines = [started[position] + timeout for position in pending.values() if position in started]
+                wait_for = max(0.0, min(deadlines) - now) if deadlines else timeout
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position = pending.pop(future)
+                    try:
+                        merged.extend(future.result())
+                    except Exception as e:
+                        failed.append(tuple(targets[position]) + (str(e),))
+        finally:
+            # Don't wait on targets that timed out; their results are simply discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for club_id, zone_type_id, reason in failed:
+            print(f"Schedule fan-out: club {club_id} zone type {zone_type_id} failed: {reason}")
+
+        merged.sort(key=lambda slot: slot.start_time)
+        return {"slots": merged, "failed": failed}
+
+    def get_schedule_index(self, days: int = 14, deadline: Optional[float] = None) -> Optional[SlotIndex]:
+        """
+        Get a time-range index over the next days of schedule
+
+        The index is built once per fetch and shared through the schedule cache,
+        so repeated lookups (chat turns, page reruns) do not re-parse any slots.
+
+        Args:
+            days: Number of days to cover, starting from today
+            deadline: Seconds to wait for PerfectGym before returning an older cached copy instead
+
+        Returns:
+            SlotIndex (its fetched_at / age tell how old the data is), or None if the
+            schedule could not be fetched
+        """
+        try:
+            snapshot = self._get_warm_snapshot(datetime.now().date() + timedelta(days=days))
+            if snapshot is None:
+                snapshot = self._get_snapshot(days, start_date=self._default_start_date(), deadline=deadline)
+            return snapshot.index if snapshot else None
         except Exception as e:
             print(f"Schedule fetch error: {e}")
-            return []
+            return None
+
+    def refresh_schedule(self, days: int) -> bool:
+        """
+        Fetch the next days from PerfectGym now, replacing the cached and stored copies
+
+        Used by ScheduleWarmer so user-facing reads never wait on upstream.
+
+        Returns:
+            True if the refresh succeeded
+        """
+        try:
+            return self._get_snapshot(days, start_date=self._default_start_date(), refresh=True) is not None
+        except Exception as e:
+            print(f"Schedule refresh error: {e}")
+            return False
+
+    def _default_start_date(self) -> Optional[date_type]:
+        """Start day for fetches beginning today: explicit in windowed mode, implicit otherwise"""
+        return datetime.now().date() if self.schedule_start_date_param else None
+
+    def _cache_key(self, days: int, start_date: Optional[date_type] = None,
+                   club_id: Optional[int] = None, zone_type_id: Optional[int] = None) -> tuple:
+        """Schedule cache key; the payload does not depend on the user, so it is shared across sessions"""
+        cache_key = (club_id or self.club_id, zone_type_id or self.zone_type_id, days)
+        if start_date:
+            cache_key += (start_date.isoformat(),)
+        return cache_key
+
+    def _get_window_snapshot(self, date: Optional[datetime], days: int, club_id: Optional[int] = None,
+                             zone_type_id: Optional[int] = None,
+                             deadline: Optional[float] = None) -> Tuple[Optional[ScheduleSnapshot], Optional[date_type]]:
+        """
+        Snapshot covering [date, date + days) for a club and zone type (defaults to this client's)
+
+        Returns:
+            Tuple of (snapshot or None, first day to clip to, or None if the snapshot is exactly the window)
+        """
+        today = datetime.now().date()
+        first_day = max(date.date(), today) if date else today
+        window_start = date.date() if date else None
+
+        # Prefer the copy kept warm by a background ScheduleWarmer; it may cover more days
+        snapshot = self._get_warm_snapshot(first_day + timedelta(days=days), club_id, zone_type_id)
+        if snapshot is not None:
+            return snapshot, window_start or today
+
+        if self.schedule_start_date_param:
+            # Fetch only the requested window, in parallel chunks
+            snapshot = self._get_snapshot(days, start_date=first_day, club_id=club_id, zone_type_id=zone_type_id,
+                                          deadline=deadline)
+        else:
+            # If a specific date is requested, ensure we fetch enough days to include it
+            snapshot = self._get_snapshot(schedule_horizon(date, days), club_id=club_id, zone_type_id=zone_type_id,
+                                          deadline=deadline)
+        return snapshot, window_start
+
+    def _get_warm_snapshot(self, end_day: date_type, club_id: Optional[int] = None,
+                           zone_type_id: Optional[int] = None) -> Optional[ScheduleSnapshot]:
+        """Snapshot kept warm by a ScheduleWarmer, if one covers every day before end_day"""
+        club_id = club_id or self.club_id
+        zone_type_id = zone_type_id or self.zone_type_id
+        warm_days = warm_horizon(club_id, zone_type_id)
+        today = datetime.now().date()
+        if not warm_days or end_day > today + timedelta(days=warm_days):
+            return None
+        return self.schedule_cache.get(self._cache_key(warm_days, self._default_start_date(), club_id, zone_type_id))
+
+    def _get_snapshot(self, days: int, start_date: Optional[date_type] = None, refresh: bool = False,
+                      club_id: Optional[int] = None, zone_type_id: Optional[int] = None,
+                      deadline: Optional[float] = None) -> Optional[ScheduleSnapshot]:
+        """
+        Cached schedule snapshot, fetching it on a miss
+
+        A copy past the cache TTL but within stale_ttl is returned at once while a
+        background refresh replaces it (stale-while-revalidate).
+
+        Args:
+            days: Number of days to cover
+            start_date: First day of a windowed fetch; None means a plain fetch starting today
+            refresh: Skip the memory and disk copies and fetch from PerfectGym
+            club_id: Club to fetch (defaults to this client's)
+            zone_type_id: Zone type to fetch (defaults to this client's)
+            deadline: Seconds to wait for PerfectGym before serving an older copy instead
+                (if there is none, keeps waiting); None waits for the fetch
+        """
+        club_id = club_id or self.club_id
+        zone_type_id = zone_type_id or self.zone_type_id
+        cache_key = self._cache_key(days, start_date, club_id, zone_type_id)
+        snapshot = None if refresh else self.schedule_cache.get(cache_key)
+        if snapshot is not None:
+            return snapshot
+
+        # Warm start: another process (or our previous run) may have the window on disk
+        first_day = start_date or datetime.now().date()
+        if self.schedule_store and not refresh:
+            try:
+                # Only rows within the cache TTL are a hit: older ones go through
+                # stale-while-revalidate below, so a refresh gets started
+                stored = self.schedule_store.load(club_id, zone_type_id, first_day, days,
+                                                  max_age=self.schedule_cache.ttl)
+            except sqlite3.Error as e:
+                print(f"Schedule store read error: {e}")
+                stored = None
+            if stored:
+                snapshot = ScheduleSnapshot(*stored)
+                self.schedule_cache.put(cache_key, snapshot, age=time.time() - snapshot.fetched_at)
+                return snapshot
+
+        if refresh:
+            return self._fetch_snapshot(cache_key, days, start_date, club_id, zone_type_id)
+
+        # Stale-while-revalidate: serve a recently expired copy now, refresh in the background
+        snapshot = self._get_stale_snapshot(cache_key, club_id, zone_type_id, first_day, days, self.stale_ttl)
+        if snapshot is not None:
+            self._revalidate(cache_key, days, start_date, club_id, zone_type_id)
+            return snapshot
+
+        if deadline is None:
+            snapshot = self._fetch_snapshot(cache_key, days, start_date, club_id, zone_type_id)
+        else:
+            # The fetch keeps running after the deadline and fills the cache for the next read
+            future = _background.submit(self._fetch_snapshot, cache_key, days, start_date, club_id, zone_type_id)
+            try:
+                snapshot = future.result(timeout=deadline)
+            except FutureTimeout:
+                print(f"Schedule fetch exceeded {deadline:.1f}s deadline")
+                snapshot = self._get_stale_snapshot(cache_key, club_id, zone_type_id, first_day, days,
+                                                    self.stale_if_error)
+                if snapshot is not None:
+                    return snapshot
+                snapshot = future.result()
+
+        if snapshot is None:
+            # PerfectGym failed (or its breaker is open): an old schedule beats no schedule
+            return self._get_stale_snapshot(cache_key, club_id, zone_type_id, first_day, days, self.stale_if_error)
+        return snapshot
+
+    def _fetch_snapshot(self, cache_key: tuple, days: int, start_date: Optional[date_type], club_id: int,
+                        zone_type_id: int) -> Optional[ScheduleSnapshot]:
+        """Fetch a schedule from PerfectGym and store it in the cache and on disk; None on failure"""
+        # Validate session before making request
+        if not self.is_session_valid() and self.email and self.password:
+            print("Session expired, refreshing...")
+            if not self._refresh_login():
+                print("Failed to refresh session")
+                return None
+
+        if start_date:
+            slots = self._fetch_schedule_window(start_date, days, club_id, zone_type_id)
+        else:
+            slots = self._fetch_schedule_slots(days, club_id=club_id, zone_type_id=zone_type_id)
+        if slots is None:
+            return None
+
+        # Same content as last time (the parse memo returned the same list): keep the
+        # snapshot with its table and index, just mark it as confirmed now
+        previous = self.schedule_cache.get_stale(cache_key)
+        unchanged = previous is not None and previous[0].slots is slots
+        if unchanged:
+            snapshot = previous[0]
+            previous_fetched_at = snapshot.fetched_at
+            snapshot.touch()
+        else:
+            snapshot = ScheduleSnapshot(slots)
+        self.schedule_cache.put(cache_key, snapshot)
+
+        if self.schedule_store:
+            try:
+                first_day = start_date or datetime.now().date()
+                # The rows on disk are only known to match if nobody rewrote them since our copy:
+                # otherwise (another process saved other content) write ours again
+                if not (unchanged and self.schedule_store.touch(club_id, zone_type_id, first_day, days,
+                                                                snapshot.fetched_at, previous_fetched_at)):
+                    self.schedule_store.save(club_id, zone_type_id, first_day, days, slots, snapshot.fetched_at)
+            except sqlite3.Error as e:
+                print(f"Schedule store write error: {e}")
+        return snapshot
+
+    def _revalidate(self, cache_key: tuple, days: int, start_date: Optional[date_type], club_id: int,
+                    zone_type_id: int) -> None:
+        """Refresh a schedule in the background, unless a refresh for it is already running"""
+        with _revalidating_lock:
+            if cache_key in _revalidating:
+                return
+            _revalidating.add(cache_key)
+
+        def refresh() -> None:
+            try:
+                self._fetch_snapshot(cache_key, days, start_date, club_id, zone_type_id)
+            except Exception as e:
+                print(f"Background schedule refresh error: {e}")
+            finally:
+                with _revalidating_lock:
+                    _revalidating.discard(cache_key)
+
+        _revalidation.submit(refresh)
+
+    def _get_stale_snapshot(self, cache_key: tuple, club_id: int, zone_type_id: int, first_day: date_type,
+                            days: int, max_age: float) -> Optional[ScheduleSnapshot]:
+        """Expired copy of a schedule (memory first, then disk), if not older than max_age seconds"""
+        cached = self.schedule_cache.get_stale(cache_key)
+        if cached is not None and cached[1] <= max_age:
+            print(f"Serving cached schedule from {cached[1]:.0f}s ago")
+            return cached[0]
+
+        if self.schedule_store:
+            try:
+                stored = self.schedule_store.load(club_id, zone_type_id, first_day, days, max_age=max_age)
+            except sqlite3.Error as e:
+                print(f"Schedule store read error: {e}")
+                stored = None
+            if stored:
+                print(f"Serving stored schedule from {time.time() - stored[1]:.0f}s ago")
+                snapshot = ScheduleSnapshot(*stored)
+                self.schedule_cache.put(cache_key, snapshot, age=time.time() - snapshot.fetched_at)
+                return snapshot
+        return None
+
+    def _fetch_schedule_window(self, start_date: date_type, days: int, club_id: Optional[int] = None,
+                               zone_type_id: Optional[int] = None) -> Optional[List[Slot]]:
+        """
+        Fetch [start_date, start_date + days) as bounded chunks in parallel, then merge them
+
+        Requires schedule_start_date_param so each chunk only transfers its own days.
+
+        Returns:
+            Sorted, de-duplicated list of bookable slots, or None if any chunk failed
+        """
+        chunk_days = max(1, self.schedule_window_days)
+        chunks = [(start_date + timedelta(days=offset), min(chunk_days, days - offset))
+                  for offset in range(0, days, chunk_days)]
+
+        def fetch(chunk: Tuple[date_type, int]) -> Optional[List[Slot]]:
+            return self._fetch_schedule_slots(chunk[1], chunk[0], club_id, zone_type_id)
+
+        if len(chunks) == 1:
+            results = [fetch(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(chunks), self.max_parallel_fetches)) as executor:
+                results = list(executor.map(fetch, chunks))
+
+        if any(result is None for result in results):
+            return None
+
+        # Chunks may overlap if the server pads its answer, so keep each slot once and stay in the window
+        first_day = start_date.isoformat()
+        end_day = (start_date + timedelta(days=days)).isoformat()
+        seen = set()
+        slots = []
+        for result in results:
+            for slot in result:
+                key = (slot.id, slot.start_time)
+                if key in seen or not first_day <= slot.start_time[:10] < end_day:
+                    continue
+                seen.add(key)
+                slots.append(slot)
+
+        slots.sort(key=lambda slot: slot.start_time)
+        return slots
+
+    def _fetch_schedule_slots(self, days: int, start_date: Optional[date_type] = None, club_id: Optional[int] = None,
+                              zone_type_id: Optional[int] = None) -> Optional[List[Slot]]:
+        """
+        Fetch and flatten the weekly schedule from PerfectGym
+
+        Args:
+            days: Number of days to fetch, starting from today (or start_date)
+            start_date: First day to fetch; only sent if schedule_start_date_param is configured
+            club_id: Club to fetch (defaults to this client's)
+            zone_type_id: Zone type to fetch (defaults to this client's)
+
+        Returns:
+            Sorted list of bookable slots, or None if the request failed
+        """
+        schedule_url = f"{self.base_url}/ClientPortal2/FacilityBookings/FacilityCalendar/GetWeeklySchedule"
+
+        payload = {
+            "clubId": club_id or self.club_id,
+            "zoneTypeId": str(zone_type_id or self.zone_type_id),
+            "zoneId": None,
+            "daysInWeek": days
+        }
+        if start_date and self.schedule_start_date_param:
+            payload[self.schedule_start_date_param] = start_date.strftime('%Y-%m-%dT00:00:00')
+
+        # Concurrent cache misses share one upstream request and its parsed result
+        if self.stream_schedule and ijson is not None:
+            return self._coalesced_request('POST', schedule_url, self._parse_schedule_stream,
+                                           json=payload, stream=True)
+        return self._coalesced_request('POST', schedule_url, self._parse_schedule_response, json=payload)
+
+    def _parse_schedule_response(self, response: Optional[requests.Response]) -> Optional[List[Slot]]:
+        """Flatten a GetWeeklySchedule response into a sorted list of bookable slots"""
+        if response is None:
+            print("Failed to fetch schedule after retries")
+            return None
+
+        if response.status_code != 200:
+            print(f"Failed to fetch schedule: {response.status_code}")
+            return None
+
+        # Unchanged bodies (the common case when polling) come back without any parsing
+        slots, unchanged = self.parse_memo.flatten(response.content)
+        if not unchanged and slots:
+            print(f"DEBUG: Fetched {len(slots)} total slots")
+            print(f"DEBUG: First slot: {slots[0]['start_time']}")
+            print(f"DEBUG: Last slot: {slots[-1]['start_time']}")
+        return slots
+
+    def _parse_schedule_stream(self, response: Optional[requests.Response]) -> Optional[List[Slot]]:
+        """Like _parse_schedule_response, but reads the body incrementally without buffering it"""
+        if response is None:
+            print("Failed to fetch schedule after retries")
+            return None
+
+        try:
+            if response.status_code != 200:
+                print(f"Failed to fetch schedule: {response.status_code}")
+                return None
+
+            # Let urllib3 undo gzip/deflate while we read
+            response.raw.decode_content = True
+            return flatten_schedule_stream(response.raw)
+        finally:
+            response.close()
 
     def get_booking_url(self, start_time: datetime, zone_id: int = None) -> str:
         """
@@ -280,93 +890,183 @@ class PerfectGymClient:
             # Validate session before booking
             if not self.is_session_valid() and self.email and self.password:
                 print("Session expired, refreshing before booking...")
-                if not self.login(self.email, self.password):
+                if not self._refresh_login():
                     return {"success": False, "error": "Session expired. Please login again."}
 
-            # Step 1: Start the booking wizard (GET)
-            start_url = f"{self.base_url}/ClientPortal2/FacilityBookings/BookFacility/Start"
-            start_params = {
-                "clubId": self.club_id,
-                "startDate": start_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                "zoneTypeId": self.zone_type_id,
-                "RedirectUrl": f"{self.base_url}/ClientPortal2/"
-            }
+            return self._run_booking_wizard(self.session, zone_id, start_time, duration_minutes)
 
-            success, start_response = self._make_request_with_retry('GET', start_url, params=start_params)
-            if not success or start_response.status_code != 200:
-                return {"success": False, "error": f"Failed to start booking: {start_response.status_code if start_response else 'timeout'}"}
-
-            # Small delay to mimic human interaction
-            time.sleep(0.5)
-
-            # Step 2: Set booking details (court, time, duration)
-            details_url = f"{self.base_url}/ClientPortal2/FacilityBookings/WizardSteps/SetFacilityBookingDetailsWizardStep/Next"
-            details_payload = {
-                "UserId": self.user_id,
-                "ZoneId": zone_id,
-                "StartTime": start_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                "Duration": duration_minutes,
-                "RequiredNumberOfSlots": None
-            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def book_courts(self, bookings: List[Tuple], max_workers: int = 4) -> Dict[str, Any]:
+        """
+        Book several courts concurrently, each in its own isolated wizard session
+
+        Every booking runs the full wizard (Start, details, confirm) on a separate
+        requests.Session that shares only the auth token, so the wizards don't
+        interfere and N bookings take about as long as one.
 
-            success, details_response = self._make_request_with_retry('POST', details_url, json=details_payload)
-            if not success or details_response.status_code != 200:
-                error_msg = details_response.text if details_response else "timeout"
-                return {"success": False, "error": f"Failed to set booking details: {error_msg}"}
+        Args:
+            bookings: List of (zone_id, start_time) or (zone_id, start_time, duration_minutes)
+            max_workers: Maximum number of wizards running at once
 
-            # Extract rule ID from response
-            details_data = details_response.json()
-            if 'Data' not in details_data or 'RuleId' not in details_data['Data']:
-                return {"success": False, "error": "No booking rule found"}
+        Returns:
+            dict with "success" (all booked), "booked" and "failed" counts and
+            "results" (one book_court-style dict per booking, in input order,
+            with zone_id and requested_start added)
+        """
+        if not self.is_session_valid() and self.email and self.password:
+            print("Session expired, refreshing before booking...")
+            if not self._refresh_login():
+                return {"success": False, "booked": 0, "failed": len(bookings),
+                        "results": [{"success": False, "error": "Session expired. Please login again."}
+                                    for _ in bookings]}
+
+        def book(booking: Tuple) -> dict:
+            zone_id, start_time = booking[0], booking[1]
+            duration_minutes = booking[2] if len(booking) > 2 else 30
+            session = self._new_wizard_session()
+            try:
+                result = self._run_booking_wizard(session, zone_id, start_time, duration_minutes)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            result.update({"zone_id": zone_id, "requested_start": start_time.strftime('%Y-%m-%dT%H:%M:%S')})
+            return result
+
+        if not bookings:
+            return {"success": True, "booked": 0, "failed": 0, "results": []}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(bookings)))) as executor:
+            results = list(executor.map(book, bookings))
+
+        booked = sum(1 for r in results if r.get("success"))
+        return {
+            "success": booked == len(results),
+            "booked": booked,
+            "failed": len(results) - booked,
+            "results": results
+        }
 
-            rule_id = details_data['Data']['RuleId']
+    def _new_wizard_session(self) -> requests.Session:
+        """
+        Fresh session carrying only this client's headers and auth token (no server-side wizard state)
 
-            # Small delay before confirmation
-            time.sleep(0.5)
+        It shares the client's connection pool, so don't close it (that would close the pool).
+        """
+        session = requests.Session()
+        session.headers.update(self.session.headers)
+        mount_transport(session, self.transport)
+        self._copy_auth(session)
+        return session
+
+    def _copy_auth(self, session: requests.Session) -> None:
+        """Copy the current auth token (cookie and header) into another session"""
+        for cookie in self.session.cookies:
+            if cookie.name in self.auth_cookie_names:
+                session.cookies.set_cookie(cookie)
+        if 'Authorization' in self.session.headers:
+            session.headers['Authorization'] = self.session.headers['Authorization']
+
+    def _run_booking_wizard(self, session: requests.Session, zone_id: int, start_time: datetime,
+                            duration_minutes: int) -> dict:
+        """Run the three booking wizard steps on the given session, pausing wizard_step_delay between them"""
+        error = self._wizard_start(session, start_time)
+        if error:
+            return error
+
+        # Small delay to mimic human interaction
+        time.sleep(self.wizard_step_delay)
+
+        rule_id, error = self._wizard_details(session, zone_id, start_time, duration_minutes)
+        if error:
+            return error
+
+        # Small delay before confirmation
+        time.sleep(self.wizard_step_delay)
+
+        return self._wizard_confirm(session, rule_id)
+
+    def _wizard_start(self, session: requests.Session, start_time: datetime) -> Optional[dict]:
+        """Step 1: start the booking wizard (GET); returns an error result or None"""
+        start_url = f"{self.base_url}/ClientPortal2/FacilityBookings/BookFacility/Start"
+        start_params = {
+            "clubId": self.club_id,
+            "startDate": start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "zoneTypeId": self.zone_type_id,
+            "RedirectUrl": f"{self.base_url}/ClientPortal2/"
+        }
 
-            # Step 3: Confirm booking with rule
-            confirm_url = f"{self.base_url}/ClientPortal2/FacilityBookings/WizardSteps/ChooseBookingRuleStep/Next"
-            confirm_payload = {
-                "ruleId": rule_id,
-                "OtherCalendarEventBookedAtRequestedTime": False,
-                "HasUserRequiredProducts": False,
-                "ShouldBuyRequiredProductOnDebit": True
-            }
+        success, start_response = self._make_request_with_retry('GET', start_url, session=session, params=start_params)
+        if not success or start_response.status_code != 200:
+            return {"success": False, "error": f"Failed to start booking: {start_response.status_code if start_response else 'timeout'}"}
+        return None
+
+    def _wizard_details(self, session: requests.Session, zone_id: int, start_time: datetime,
+                        duration_minutes: int) -> Tuple[Optional[Any], Optional[dict]]:
+        """Step 2: set booking details (court, time, duration); returns (rule_id, error result)"""
+        details_url = f"{self.base_url}/ClientPortal2/FacilityBookings/WizardSteps/SetFacilityBookingDetailsWizardStep/Next"
+        details_payload = {
+            "UserId": self.user_id,
+            "ZoneId": zone_id,
+            "StartTime": start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "Duration": duration_minutes,
+            "RequiredNumberOfSlots": None
+        }
 
-            success, confirm_response = self._make_request_with_retry('POST', confirm_url, json=confirm_payload)
-            if not success or confirm_response.status_code != 200:
-                return {"success": False, "error": f"Failed to confirm booking: {confirm_response.status_code if confirm_response else 'timeout'}"}
-
-            # Check if booking was successful
-            confirm_data = confirm_response.json()
-            if 'Data' in confirm_data and 'FacilityBooking' in confirm_data['Data']:
-                booking = confirm_data['Data']['FacilityBooking']
-                return {
-                    "success": True,
-                    "start_time": booking.get('StartDate'),
-                    "duration": booking.get('Duration'),
-                    "user": booking.get('User', {}).get('FirstName', '') + ' ' + booking.get('User', {}).get('LastName', ''),
-                    "message": "Booking confirmed! Check your email for payment instructions."
-                }
-            else:
-                return {"success": False, "error": "Booking confirmation data missing"}
+        success, details_response = self._make_request_with_retry('POST', details_url, session=session, json=details_payload)
+        if not success or details_response.status_code != 200:
+            error_msg = details_response.text if details_response else "timeout"
+            return None, {"success": False, "error": f"Failed to set booking details: {error_msg}"}
+
+        # Extract rule ID from response
+        details_data = details_response.json()
+        if 'Data' not in details_data or 'RuleId' not in details_data['Data']:
+            return None, {"success": False, "error": "No booking rule found"}
+
+        return details_data['Data']['RuleId'], None
+
+    def _wizard_confirm(self, session: requests.Session, rule_id: Any) -> dict:
+        """Step 3: confirm the booking with the chosen rule"""
+        confirm_url = f"{self.base_url}/ClientPortal2/FacilityBookings/WizardSteps/ChooseBookingRuleStep/Next"
+        confirm_payload = {
+            "ruleId": rule_id,
+            "OtherCalendarEventBookedAtRequestedTime": False,
+            "HasUserRequiredProducts": False,
+            "ShouldBuyRequiredProductOnDebit": True
+        }
 
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        success, confirm_response = self._make_request_with_retry('POST', confirm_url, session=session, json=confirm_payload)
+        if not success or confirm_response.status_code != 200:
+            return {"success": False, "error": f"Failed to confirm booking: {confirm_response.status_code if confirm_response else 'timeout'}"}
+
+        # Check if booking was successful
+        confirm_data = confirm_response.json()
+        if 'Data' in confirm_data and 'FacilityBooking' in confirm_data['Data']:
+            booking = confirm_data['Data']['FacilityBooking']
+            return {
+                "success": True,
+                "start_time": booking.get('StartDate'),
+                "duration": booking.get('Duration'),
+                "user": booking.get('User', {}).get('FirstName', '') + ' ' + booking.get('User', {}).get('LastName', ''),
+                "message": "Booking confirmed! Check your email for payment instructions."
+            }
+        else:
+            return {"success": False, "error": "Booking confirmation data missing"}
 
-    def get_my_bookings(self) -> List[Dict[str, Any]]:
+    def get_my_bookings(self) -> BookingsResult:
         """
         Get user's current bookings
 
         Returns:
-            List of user's bookings
+            List of user's bookings (a BookingsResult; stale if PerfectGym failed and
+            these are the last bookings seen)
         """
         try:
             # Validate session
             if not self.is_session_valid() and self.email and self.password:
                 print("Session expired, refreshing...")
-                if not self.login(self.email, self.password):
-                    return []
+                if not self._refresh_login():
+                    return self._last_bookings.served_stale()
 
             bookings_url = f"{self.base_url}/Api/FacilityBooking/MyBookings"
 
@@ -375,16 +1075,21 @@ class PerfectGymClient:
                 "userId": self.user_id
             }
 
-            success, response = self._make_request_with_retry('GET', bookings_url, params=params)
+            def parse(response: Optional[requests.Response]) -> Optional[List[Dict[str, Any]]]:
+                if response and response.status_code == 200:
+                    return response.json()
+                return None
 
-            if success and response and response.status_code == 200:
-                return response.json()
-            else:
-                return []
+            bookings = self._coalesced_request('GET', bookings_url, parse, params=params)
+            if bookings is None:
+                # PerfectGym failed (or its breaker is open): show the last bookings we saw
+                return self._last_bookings.served_stale()
+            self._last_bookings = BookingsResult(bookings)
+            return self._last_bookings
 
         except Exception as e:
             print(f"Error fetching bookings: {e}")
-            return []
+            return self._last_bookings.served_stale()
 
     def cancel_booking(self, booking_id: str) -> bool:
         """
@@ -400,7 +1105,7 @@ class PerfectGymClient:
             # Validate session
             if not self.is_session_valid() and self.email and self.password:
                 print("Session expired, refreshing...")
-                if not self.login(self.email, self.password):
+                if not self._refresh_login():
                     return False
 
             cancel_url = f"{self.base_url}/Api/FacilityBooking/Cancel"
@@ -427,5 +1132,11 @@ class PerfectGymClient:
             pass
         finally:
             self.access_token = None
+            self.token_expires_at = None
             self.user_id = None
+            self._last_bookings = BookingsResult(stale=True)
+            self._auth_generation += 1
             self.session.headers.pop('Authorization', None)
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
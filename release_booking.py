@@ -0,0 +1,254 @@
+"""
+Release-time booking
+
+Popular slots go within seconds of being released. ReleaseTimeBooker does
+everything that doesn't depend on the release ahead of time: it logs in, opens
+and keeps a connection hot, runs the wizard Start step and estimates the
+offset between our clock and the server's from response Date headers. At the
+release instant (server time) it only fires the details and confirm steps,
+back to back, and reports how long each step took.
+
+Usage:
+    PERFECTGYM_EMAIL=... PERFECTGYM_PASSWORD=... \\
+        python release_booking.py 87 2026-10-24T18:00 --release 2026-10-17T00:00:00
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+from perfectgym_client import PerfectGymClient
+
+load_dotenv()
+
+
+class ReleaseTimeBooker:
+    """Books one court at the moment it is released, with everything else done in advance"""
+
+    def __init__(self, client: PerfectGymClient, zone_id: int, start_time: datetime,
+                 release_at: datetime, duration_minutes: int = 30, prepare_lead: float = 30.0,
+                 keepalive_interval: float = 10.0, clock_samples: int = 5, fire_early: float = 0.0):
+        """
+        Args:
+            client: Logged-in client (or one with stored credentials to log in again)
+            zone_id: ID of the court to book
+            start_time: Start time of the booking
+            release_at: When the slot opens, in local time (naive) or any timezone (aware)
+            duration_minutes: Duration in minutes
+            prepare_lead: Seconds before the release to log in, warm up and run the Start step
+            keepalive_interval: Seconds between keep-alive requests while waiting
+            clock_samples: Number of Date-header samples for the clock offset estimate
+            fire_early: Seconds to send before the release (e.g. half the round trip), 0 to send on time
+        """
+        self.client = client
+        self.zone_id = zone_id
+        self.start_time = start_time
+        self.release_at = release_at
+        self.duration_minutes = duration_minutes
+        self.prepare_lead = prepare_lead
+        self.keepalive_interval = keepalive_interval
+        self.clock_samples = clock_samples
+        self.fire_early = fire_early
+
+        self.clock_offset = 0.0  # server clock minus local clock, seconds
+        self.clock_error = None  # half-width of the offset estimate, seconds
+        self.timings: Dict[str, float] = {}
+        self._session: Optional[requests.Session] = None
+        self._prepared = False
+
+    @property
+    def release_epoch(self) -> float:
+        """Release instant as epoch seconds on the server's clock"""
+        return self.release_at.timestamp()
+
+    def server_now(self) -> float:
+        """Current server time (epoch seconds) according to the offset estimate"""
+        return time.time() + self.clock_offset
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Wait for the prepare window, prepare, wait for the release and book
+
+        Returns:
+            book_court-style result dict with "timings" (milliseconds per step),
+            "clock_offset" and "clock_error" (seconds) added
+        """
+        self._sleep_until(self.release_epoch - self.prepare_lead)
+        result = self.prepare()
+        if result:
+            return result
+        return self.fire()
+
+    def prepare(self) -> Optional[Dict[str, Any]]:
+        """
+        Log in, warm the connection, estimate the clock offset and run the Start step
+
+        Returns:
+            Error result dict, or None when ready to fire
+        """
+        step = time.perf_counter()
+        if not self.client.is_session_valid():
+            if not (self.client.email and self.client.password) or not self.client._refresh_login():
+                return self._result({"success": False, "error": "Not logged in"})
+        self.timings['login'] = _ms_since(step)
+
+        self._session = self.client._new_wizard_session()
+
+        # First request pays for DNS, TCP and TLS; the clock samples reuse the connection
+        step = time.perf_counter()
+        self._ping()
+        self.timings['warmup'] = _ms_since(step)
+
+        step = time.perf_counter()
+        self.clock_offset, self.clock_error = self.estimate_clock_offset()
+        self.timings['clock_sync'] = _ms_since(step)
+
+        step = time.perf_counter()
+        error = self.client._wizard_start(self._session, self.start_time)
+        self.timings['start'] = _ms_since(step)
+        if error:
+            return self._result(error)
+
+        self._prepared = True
+        return None
+
+    def fire(self) -> Dict[str, Any]:
+        """Wait for the release (server time), then send the details and confirm steps back to back"""
+        if not self._prepared:
+            return self._result({"success": False, "error": "prepare() has not completed"})
+
+        target = self.release_epoch - self.fire_early
+        self._wait_for_server_time(target)
+        self.timings['fire_lateness'] = (self.server_now() - target) * 1000
+
+        fired = time.perf_counter()
+        rule_id, error = self.client._wizard_details(self._session, self.zone_id, self.start_time,
+                                                     self.duration_minutes)
+        self.timings['details'] = _ms_since(fired)
+        if error:
+            self.timings['total'] = _ms_since(fired)
+            return self._result(error)
+
+        step = time.perf_counter()
+        result = self.client._wizard_confirm(self._session, rule_id)
+        self.timings['confirm'] = _ms_since(step)
+        self.timings['total'] = _ms_since(fired)
+        return self._result(result)
+
+    def estimate_clock_offset(self) -> Tuple[float, float]:
+        """
+        Estimate the server clock offset from Date headers (one-second resolution)
+
+        Each response says the server clock read [D, D + 1) at some point between
+        sending the request (t0) and receiving the response (t1), so the offset is
+        in [D - t1, D + 1 - t0]. Intersecting several samples narrows the bound.
+
+        Returns:
+            Tuple of (offset, error) in seconds: server time = local time + offset ± error
+        """
+        low, high = float('-inf'), float('inf')
+        for _ in range(self.clock_samples):
+            sent = time.time()
+            response = self._ping()
+            received = time.time()
+            server_date = response.headers.get('Date') if response is not None else None
+            if not server_date:
+                continue
+            second = parsedate_to_datetime(server_date).timestamp()
+            sample_low, sample_high = second - received, second + 1 - sent
+            if sample_low > high or sample_high < low:
+                # Inconsistent sample (clock step on either side); start over from it
+                low, high = sample_low, sample_high
+            else:
+                low, high = max(low, sample_low), min(high, sample_high)
+
+            # Spread the samples across the server second so their bounds overlap differently
+            time.sleep(1.0 / self.clock_samples)
+
+        if low == float('-inf'):
+            print("Release booking: no Date headers, assuming server clock matches ours")
+            return 0.0, None
+        return (low + high) / 2, (high - low) / 2
+
+    def _ping(self) -> Optional[requests.Response]:
+        """Cheap request on the wizard session to open or keep its connection alive"""
+        try:
+            return self._session.head(f"{self.client.base_url}/ClientPortal2/", timeout=self.client.timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"Release booking: keep-alive failed: {e}")
+            return None
+
+    def _wait_for_server_time(self, target: float) -> None:
+        """Sleep (keeping the connection hot) until just before target, then spin"""
+        while True:
+            remaining = target - self.server_now()
+            if remaining <= 0.02:
+                break
+            if remaining > self.keepalive_interval + 1:
+                time.sleep(self.keepalive_interval)
+                self._ping()
+            else:
+                time.sleep(remaining - 0.02)
+        while self.server_now() < target:
+            pass
+
+    def _sleep_until(self, epoch: float) -> None:
+        remaining = epoch - time.time()
+        if remaining > 0:
+            print(f"Release booking: preparing in {remaining:.0f}s")
+            time.sleep(remaining)
+
+    def _result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        # The wizard session shares the client's connection pool: drop it, don't close it
+        self._session = None
+        result.update({
+            "timings": {step: round(ms, 1) for step, ms in self.timings.items()},
+            "clock_offset": self.clock_offset,
+            "clock_error": self.clock_error
+        })
+        return result
+
+
+def _ms_since(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    """Book one court at release time from the command line"""
+    parser = argparse.ArgumentParser(description="Book a court the moment it is released")
+    parser.add_argument("zone_id", type=int, help="Court zone ID (87-98 for courts 1-12)")
+    parser.add_argument("start_time", type=datetime.fromisoformat, help="Booking start, e.g. 2026-10-24T18:00")
+    parser.add_argument("--release", type=datetime.fromisoformat, required=True,
+                        help="Release time (local), e.g. 2026-10-17T00:00:00")
+    parser.add_argument("--duration", type=int, default=30, help="Duration in minutes")
+    parser.add_argument("--fire-early", type=float, default=0.0, help="Seconds to send before the release")
+    args = parser.parse_args()
+
+    email = os.getenv("PERFECTGYM_EMAIL")
+    password = os.getenv("PERFECTGYM_PASSWORD")
+    if not email or not password:
+        print("Set PERFECTGYM_EMAIL and PERFECTGYM_PASSWORD to book at release time")
+        return
+
+    client = PerfectGymClient()
+    if not client.login(email, password):
+        print("Release booking: login failed")
+        return
+
+    booker = ReleaseTimeBooker(client, args.zone_id, args.start_time, args.release,
+                               duration_minutes=args.duration, fire_early=args.fire_early)
+    result = booker.run()
+    print(result.get("message") or result.get("error"))
+    print(f"Clock offset: {result['clock_offset'] * 1000:+.0f}ms"
+          + (f" (±{result['clock_error'] * 1000:.0f}ms)" if result['clock_error'] is not None else ""))
+    for step, ms in result["timings"].items():
+        print(f"  {step:>14}: {ms:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Resilience policy for the HTTP layer
+
+Full-jitter exponential backoff between retries, a per-process retry budget
+(retries may only add a bounded fraction on top of first attempts, so a
+degraded PerfectGym doesn't get hit by synchronized retry storms from every
+session) and a circuit breaker per endpoint that fails fast while the endpoint
+keeps failing. Callers serve cached data while a breaker is open.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Backoff:
+    """Full-jitter exponential backoff: sleep a random time in [0, min(cap, base * 2 ** attempt)]"""
+
+    def __init__(self, base: float = 0.5, cap: float = 10.0):
+        """
+        Args:
+            base: Upper bound of the first delay in seconds
+            cap: Maximum upper bound in seconds
+        """
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt: int) -> float:
+        """Delay before retry number attempt + 1 (attempt counts from 0)"""
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+
+class RetryBudget:
+    """
+    Sliding-window retry budget shared by every request in the process
+
+    Over the last window seconds, retries may make up at most ratio of first
+    attempts, plus min_retries so a quiet process can still retry at all.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window: float = 10.0):
+        """
+        Args:
+            ratio: Allowed retries per first attempt
+            min_retries: Retries always allowed per window
+            window: Window length in seconds
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+        self.exhausted = 0  # retries refused
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        """Count a first attempt"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        """Take a retry from the budget; False if the budget is spent"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if len(self._retries) < self.min_retries + self.ratio * len(self._requests):
+                self._retries.append(now)
+                return True
+            self.exhausted += 1
+            return False
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker
+
+    Opens after failure_threshold consecutive failures and fails fast for
+    reset_timeout seconds, then lets a single probe through (half-open):
+    success closes it, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 on_transition: Optional[Callable[[str, str, str], None]] = None):
+        """
+        Args:
+            name: Endpoint the breaker guards (used in metrics)
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before probing
+            on_transition: Called with (name, old_state, new_state) on every state change
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_transition = on_transition
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        """Change state and report the transition (caller holds the lock)"""
+        if state == self.state:
+            return
+        old_state, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        print(f"Circuit breaker {self.name}: {old_state} -> {state}")
+        if self.on_transition:
+            self.on_transition(self.name, old_state, state)
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now (closed, or the single half-open probe)"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._set_state(OPEN)
+
+
+class ResiliencePolicy:
+    """Backoff, retry budget and per-endpoint breakers, plus transition metrics"""
+
+    def __init__(self, backoff: Optional[Backoff] = None, budget: Optional[RetryBudget] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            backoff: Delay policy between retries
+            budget: Retry budget shared by every client using this policy
+            failure_threshold: Consecutive failures that open an endpoint's breaker
+            reset_timeout: Seconds an open breaker waits before probing
+        """
+        self.backoff = backoff or Backoff()
+        self.budget = budget or RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.transitions: Dict[Tuple[str, str, str], int] = {}  # (endpoint, from, to) -> count
+        self.rejected: Dict[str, int] = {}  # endpoint -> requests refused while open
+        self.listeners: List[Callable[[str, str, str], None]] = []
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Breaker for an endpoint (e.g. the URL path), created on first use"""
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, self.failure_threshold, self.reset_timeout,
+                                         on_transition=self._record_transition)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def record_rejected(self, endpoint: str) -> None:
+        with self._lock:
+            self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+
+    def _record_transition(self, endpoint: str, old_state: str, new_state: str) -> None:
+        with self._lock:
+            key = (endpoint, old_state, new_state)
+            self.transitions[key] = self.transitions.get(key, 0) + 1
+        for listener in self.listeners:
+            listener(endpoint, old_state, new_state)
+
+    def metrics(self) -> Dict[str, object]:
+        """Breaker states, transition and rejection counts, and retry budget usage"""
+        with self._lock:
+            breakers = dict(self._breakers)
+            transitions = {f"{endpoint}:{old}->{new}": count
+                           for (endpoint, old, new), count in self.transitions.items()}
+            rejected = dict(self.rejected)
+        return {
+            "breakers": {endpoint: breaker.state for endpoint, breaker in breakers.items()},
+            "transitions": transitions,
+            "rejected": rejected,
+            "retries_refused": self.budget.exhausted
+        }
+
+
+# Shared by every client in the process so the budget and breakers see all traffic
+shared_resilience = ResiliencePolicy(
+    backoff=Backoff(
+        base=float(os.getenv("RETRY_BACKOFF_BASE", "0.5")),
+        cap=float(os.getenv("RETRY_BACKOFF_CAP", "10"))
+    ),
+    budget=RetryBudget(
+        ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.2")),
+        min_retries=int(os.getenv("RETRY_BUDGET_MIN", "10"))
+    ),
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+)
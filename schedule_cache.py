@@ -0,0 +1,181 @@
+"""
+Process-wide schedule cache shared by every PerfectGymClient
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from schedule_parser import Slot
+from slot_index import SlotIndex
+from slot_table import SlotTable
+
+
+class ScheduleSnapshot:
+    """One fetched schedule plus the lookup structures derived from it, built lazily once"""
+
+    def __init__(self, slots: List[Slot], fetched_at: Optional[float] = None):
+        self.slots = slots
+        self.fetched_at = fetched_at or time.time()
+        self._table = None
+        self._index = None
+
+    @property
+    def age(self) -> float:
+        """Seconds since the slots were fetched from PerfectGym"""
+        return time.time() - self.fetched_at
+
+    def touch(self, fetched_at: Optional[float] = None) -> None:
+        """Mark the slots as confirmed current by a fetch that returned the same content"""
+        self.fetched_at = fetched_at or time.time()
+        if self._index is not None:
+            self._index.fetched_at = self.fetched_at
+
+    @property
+    def table(self) -> SlotTable:
+        """Columnar view of the slots"""
+        if self._table is None:
+            self._table = SlotTable.from_slots(self.slots)
+        return self._table
+
+    @property
+    def index(self) -> SlotIndex:
+        """Time-range index over the slots"""
+        if self._index is None:
+            self._index = SlotIndex(self.slots, self.table, fetched_at=self.fetched_at)
+        return self._index
+
+
+class ScheduleResult(list):
+    """Slots returned by a schedule read, marked with how old they are"""
+
+    def __init__(self, slots: List[Slot] = (), fetched_at: Optional[float] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            slots: The slots
+            fetched_at: Epoch seconds when they were fetched from PerfectGym
+            ttl: Seconds the slots count as fresh (the cache TTL they were read under); None never goes stale
+        """
+        super().__init__(slots)
+        self.fetched_at = fetched_at or time.time()
+        self.ttl = ttl
+
+    @property
+    def age(self) -> float:
+        """Seconds since the slots were fetched from PerfectGym"""
+        return time.time() - self.fetched_at
+
+    @property
+    def stale(self) -> bool:
+        """
+        Older than the TTL (a refresh is running or PerfectGym was unavailable)
+
+        Judged when read rather than stored, so a result that is kept around
+        (session state, Streamlit's data cache) goes stale as it ages.
+        """
+        return self.ttl is not None and self.age > self.ttl
+
+
+class ScheduleCache:
+    """Thread-safe TTL cache with LRU eviction for schedule snapshots"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 32):
+        """
+        Args:
+            ttl: Seconds an entry stays fresh
+            max_entries: Maximum number of entries before the least recently used one is evicted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                # Expired entries stay (until evicted) so get_stale can serve them during outages
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Return the value for key even if it has expired, for use when a refresh fails
+
+        Returns:
+            Tuple of (value, age in seconds), or None if the key was never stored or was evicted
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            return value, time.monotonic() - stored_at
+
+    def put(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """
+        Store value under key, evicting the least recently used entries if full
+
+        Args:
+            key: Cache key
+            value: Value to store
+            age: Seconds the value is already old (e.g. loaded from disk), counted against the TTL
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() - age, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or everything if no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+# Horizons kept warm by background ScheduleWarmers, keyed by (club_id, zone_type_id)
+_warm_horizons: Dict[tuple, int] = {}
+_warm_lock = threading.Lock()
+
+
+def set_warm_horizon(club_id: int, zone_type_id: int, days: Optional[int]) -> None:
+    """Record (or clear, with None) the number of days a warmer keeps cached for a club and zone type"""
+    with _warm_lock:
+        if days:
+            _warm_horizons[(club_id, zone_type_id)] = days
+        else:
+            _warm_horizons.pop((club_id, zone_type_id), None)
+
+
+def warm_horizon(club_id: int, zone_type_id: int) -> Optional[int]:
+    """Number of days kept warm for a club and zone type, or None if no warmer is running"""
+    with _warm_lock:
+        return _warm_horizons.get((club_id, zone_type_id))
+
+
+# Shared by all clients in this process. The GetWeeklySchedule payload does not
+# depend on the logged-in user, so every Streamlit session can reuse the same data.
+shared_schedule_cache = ScheduleCache(
+    ttl=float(os.getenv("SCHEDULE_CACHE_TTL", "60")),
+    max_entries=int(os.getenv("SCHEDULE_CACHE_MAX_ENTRIES", "32"))
+)
@@ -0,0 +1,441 @@
+"""
+Parsing helpers for PerfectGym GetWeeklySchedule responses, shared by the sync and async clients
+"""
+import gc
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, date as date_type
+from typing import Optional, List, Dict, Any, BinaryIO, Iterator, Callable, Tuple, Iterable
+
+try:
+    import ijson
+except ImportError:  # Streaming parse falls back to a full decode without it
+    ijson = None
+
+# Optional fast decoders: msgspec decodes straight into typed structs, orjson into dicts
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson prefix of each slot object: CalendarData[*].ClassesPerDay[*][*]
+_SLOT_PREFIX = 'CalendarData.item.ClassesPerDay.item.item'
+
+_ISO_DURATION = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?')
+
+
+def schedule_horizon(date: Optional[datetime], days: int) -> int:
+    """
+    Number of days to request so that the window [date, date + days) is covered
+
+    The API returns schedule starting from current server time, so a future
+    date needs the days until the target PLUS the requested number of days.
+    """
+    if date:
+        days_until_target = (date.date() - datetime.now().date()).days
+        if days_until_target > 0:
+            return days_until_target + days
+    return days
+
+
+@lru_cache(maxsize=256)  # a schedule only uses a handful of distinct durations
+def iso_duration_minutes(iso_duration: Optional[str]) -> int:
+    """Convert an ISO 8601 duration such as PT30M or PT1H30M to minutes (0 if unparseable)"""
+    match = _ISO_DURATION.match(iso_duration or '')
+    if not match:
+        return 0
+    hours, minutes = match.groups()
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def minutes_to_iso_duration(minutes: int) -> str:
+    """Convert minutes back to an ISO 8601 duration (90 -> PT1H30M)"""
+    hours, minutes = divmod(int(minutes), 60)
+    if hours and minutes:
+        return f"PT{hours}H{minutes}M"
+    if hours:
+        return f"PT{hours}H"
+    return f"PT{minutes}M"
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse a PerfectGym ISO timestamp (None if missing or malformed)"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Slot:
+    """
+    One bookable slot, with its times parsed once when the schedule is fetched
+
+    Slots read like the slot dicts they replace (slot['start_time'],
+    slot.get('id'), dict(slot)), so code written against dicts keeps working.
+    Use the parsed start / end / duration_minutes attributes rather than
+    re-parsing the ISO strings. Fetched slots are shared between callers:
+    treat them as read-only.
+    """
+
+    __slots__ = ('start_time', 'end_time', 'duration', 'status', 'id', 'available_durations',
+                 'start', 'end', 'duration_minutes', 'club_id', 'zone_type_id')
+
+    _KEYS = ('start_time', 'end_time', 'duration', 'status', 'id', 'available_durations')
+    _TAGS = ('club_id', 'zone_type_id')
+
+    def __init__(self, start_time: Optional[str], end_time: Optional[str], duration: Optional[str],
+                 status: Optional[str] = 'Bookable', id: Optional[int] = None,
+                 available_durations: Iterable[str] = (), club_id: Optional[int] = None,
+                 zone_type_id: Optional[int] = None):
+        """
+        Args:
+            start_time: ISO start time as PerfectGym sends it
+            end_time: ISO end time
+            duration: ISO 8601 booking duration (e.g. PT30M)
+            status: Slot status ('Bookable' for every slot we keep)
+            id: PerfectGym slot id
+            available_durations: ISO durations the slot can be booked for
+            club_id: Club the slot belongs to (set on get_schedule_multi results)
+            zone_type_id: Zone type the slot belongs to (set on get_schedule_multi results)
+        """
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration = duration
+        self.status = status
+        self.id = id
+        self.available_durations = list(available_durations)
+        self.start = _parse_time(start_time)
+        self.end = _parse_time(end_time)
+        self.duration_minutes = iso_duration_minutes(duration)
+        self.club_id = club_id
+        self.zone_type_id = zone_type_id
+
+    @classmethod
+    def from_dict(cls, slot: Dict[str, Any]) -> "Slot":
+        """Slot from a flattened slot dict (e.g. one read back from the schedule store)"""
+        return cls(slot.get('start_time'), slot.get('end_time'), slot.get('duration'), slot.get('status'),
+                   slot.get('id'), slot.get('available_durations') or (), slot.get('club_id'),
+                   slot.get('zone_type_id'))
+
+    def tagged(self, club_id: int, zone_type_id: int) -> "Slot":
+        """Copy of this slot labelled with the club and zone type it was fetched for (no re-parsing)"""
+        slot = Slot.__new__(Slot)
+        for field in self.__slots__:
+            setattr(slot, field, getattr(self, field))
+        slot.club_id = club_id
+        slot.zone_type_id = zone_type_id
+        return slot
+
+    @property
+    def date(self) -> Optional[date_type]:
+        """Day the slot starts on"""
+        return self.start.date() if self.start is not None else None
+
+    def keys(self) -> Tuple[str, ...]:
+        """Dict keys of the slot (the club / zone type tags only when set)"""
+        return self._KEYS + tuple(tag for tag in self._TAGS if getattr(self, tag) is not None)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        # Checked against the class-level keys, without building keys() on every lookup
+        return key in self._KEYS or (key in self._TAGS and getattr(self, key) is not None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The equivalent flattened slot dict"""
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (Slot, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Pickle (e.g. Streamlit's data cache) the strings only; restoring re-parses them,
+        # which is about twice as fast as pickling the slot state
+        return Slot, (self.start_time, self.end_time, self.duration, self.status, self.id,
+                      self.available_durations, self.club_id, self.zone_type_id)
+
+    def __repr__(self) -> str:
+        return f"Slot({self.start_time!r}, {self.end_time!r}, {self.duration!r}, id={self.id!r})"
+
+
+def group_by_date(slots: Iterable[Slot]) -> Dict[date_type, List[Slot]]:
+    """Slots grouped by the day they start on, days in order (slots keep their order within a day)"""
+    by_date: Dict[date_type, List[Slot]] = {}
+    for slot in slots:
+        if slot.start is None:
+            continue
+        day = slot.start.date()
+        day_slots = by_date.get(day)
+        if day_slots is None:
+            day_slots = by_date[day] = []
+        day_slots.append(slot)
+    return dict(sorted(by_date.items()))
+
+
+def flatten_schedule(data: Dict[str, Any]) -> List[Slot]:
+    """
+    Flatten the nested CalendarData structure into a sorted list of bookable slots
+
+    Args:
+        data: Decoded GetWeeklySchedule response
+
+    Returns:
+        List of Slots sorted by start time
+    """
+    slots = []
+
+    if 'CalendarData' in data:
+        for hour_block in data['CalendarData']:
+            # Each hour_block has ClassesPerDay which is an array of days
+            for day_index, day_slots in enumerate(hour_block.get('ClassesPerDay', [])):
+                for slot in day_slots:
+                    # Only include bookable slots
+                    if slot.get('Status') == 'Bookable':
+                        slots.append(_slot_dict(slot))
+
+    # Sort by start time
+    slots.sort(key=lambda slot: slot.start_time)
+    return slots
+
+
+def iter_bookable_slots(stream: BinaryIO) -> Iterator[Slot]:
+    """
+    Incrementally parse a GetWeeklySchedule body, yielding bookable slots as they are read
+
+    Only one raw slot object is materialized at a time, so the nested
+    CalendarData document is never held in memory.
+
+    Args:
+        stream: File-like object producing the (decoded) response body
+    """
+    if ijson is None:
+        raise RuntimeError("Streaming schedule parsing requires the ijson package")
+
+    for slot in ijson.items(stream, _SLOT_PREFIX, use_float=True):
+        if slot.get('Status') == 'Bookable':
+            yield _slot_dict(slot)
+
+
+def flatten_schedule_stream(stream: BinaryIO) -> List[Slot]:
+    """Streaming equivalent of flatten_schedule: sorted bookable slots from a response body stream"""
+    slots = list(iter_bookable_slots(stream))
+    slots.sort(key=lambda slot: slot.start_time)
+    return slots
+
+
+if msgspec is not None:
+    class _Slot(msgspec.Struct):
+        """One CalendarData slot; fields we don't read are skipped by the decoder"""
+        StartTime: Optional[str] = None
+        EndTime: Optional[str] = None
+        BookingDuration: Optional[str] = None
+        Status: Optional[str] = None
+        Id: Optional[int] = None
+        Durations: List[str] = []
+
+    class _HourBlock(msgspec.Struct):
+        ClassesPerDay: List[List[_Slot]] = []
+
+    class _WeeklySchedule(msgspec.Struct):
+        CalendarData: List[_HourBlock] = []
+
+    _schedule_decoder = msgspec.json.Decoder(_WeeklySchedule)
+
+
+def available_json_backends() -> List[str]:
+    """Schedule decoders usable here, fastest first"""
+    backends = []
+    if msgspec is not None:
+        backends.append('msgspec')
+    if orjson is not None:
+        backends.append('orjson')
+    backends.append('json')
+    return backends
+
+
+# SCHEDULE_JSON_BACKEND forces one (e.g. json to rule out a fast decoder); defaults to the fastest
+JSON_BACKEND = os.getenv("SCHEDULE_JSON_BACKEND") or available_json_backends()[0]
+if JSON_BACKEND not in available_json_backends():
+    print(f"Schedule JSON backend {JSON_BACKEND} is not installed, using {available_json_backends()[0]}")
+    JSON_BACKEND = available_json_backends()[0]
+
+
+def decode_schedule_days(body: bytes, backend: Optional[str] = None) -> List[List[tuple]]:
+    """
+    Decode a raw GetWeeklySchedule body into its bookable slots, grouped per day
+
+    Args:
+        body: Raw (decompressed) response body
+        backend: 'msgspec', 'orjson' or 'json' (defaults to JSON_BACKEND)
+
+    Returns:
+        One list per day, in day order, of (start, end, duration, id, durations) tuples
+        in the order the response lists them
+    """
+    backend = backend or JSON_BACKEND
+    days: Dict[int, list] = {}
+
+    if backend == 'msgspec':
+        for hour_block in _schedule_decoder.decode(body).CalendarData:
+            for day_index, day_slots in enumerate(hour_block.ClassesPerDay):
+                day = days.get(day_index)
+                if day is None:
+                    day = days[day_index] = []
+                day.extend((slot.StartTime, slot.EndTime, slot.BookingDuration, slot.Id, tuple(slot.Durations))
+                           for slot in day_slots if slot.Status == 'Bookable')
+    else:
+        data = orjson.loads(body) if backend == 'orjson' else json.loads(body)
+        for hour_block in data.get('CalendarData', []):
+            for day_index, day_slots in enumerate(hour_block.get('ClassesPerDay', [])):
+                day = days.get(day_index)
+                if day is None:
+                    day = days[day_index] = []
+                day.extend((slot.get('StartTime'), slot.get('EndTime'), slot.get('BookingDuration'),
+                            slot.get('Id'), tuple(slot.get('Durations', [])))
+                           for slot in day_slots if slot.get('Status') == 'Bookable')
+
+    return [days[day_index] for day_index in sorted(days)]
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Hold off the cyclic garbage collector while building a large acyclic tree
+
+    Decoding allocates hundreds of thousands of containers, each allocation
+    burst triggering collections that traverse everything decoded so far
+    without ever finding a cycle. Reference counting still frees everything.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def flatten_schedule_body(body: bytes, backend: Optional[str] = None) -> List[Slot]:
+    """flatten_schedule for a raw response body, decoded with the fastest available backend"""
+    with _gc_paused():
+        slots = [_slot_from_fields(fields) for day in decode_schedule_days(body, backend) for fields in day]
+    slots.sort(key=lambda slot: slot.start_time)
+    return slots
+
+
+class ParsedScheduleMemo:
+    """
+    Content-addressed memo of flattened GetWeeklySchedule bodies
+
+    A body seen before (same fingerprint) returns the slot list built last time
+    without decoding anything. A changed body is decoded, but each day whose
+    bookable slots are unchanged reuses its previously built Slots.
+    Returned lists are shared: treat them as read-only.
+    """
+
+    def __init__(self, max_bodies: int = 8, max_days: int = 256):
+        """
+        Args:
+            max_bodies: Whole-body fingerprints to remember
+            max_days: Per-day sections to remember
+        """
+        self.max_bodies = max_bodies
+        self.max_days = max_days
+        self._bodies = OrderedDict()  # body digest -> slots
+        self._days = OrderedDict()  # bookable slot fields of one day -> Slots
+        self._lock = threading.Lock()
+        self.body_hits = 0
+        self.day_hits = 0
+        self.day_misses = 0
+
+    def flatten(self, body: bytes,
+                decode: Callable[[bytes], List[List[tuple]]] = decode_schedule_days) -> Tuple[List[Slot], bool]:
+        """
+        Sorted bookable slots of a raw response body
+
+        Args:
+            body: Raw (decompressed) GetWeeklySchedule response body
+            decode: Turns bodies not seen before into per-day slot fields (see decode_schedule_days)
+
+        Returns:
+            Tuple of (slots, unchanged): unchanged is True if this exact body was seen before
+        """
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        with self._lock:
+            slots = self._bodies.get(digest)
+            if slots is not None:
+                self._bodies.move_to_end(digest)
+                self.body_hits += 1
+                return slots, True
+
+        with _gc_paused():
+            slots = self._flatten_days(decode(body))
+        with self._lock:
+            self._bodies[digest] = slots
+            while len(self._bodies) > self.max_bodies:
+                self._bodies.popitem(last=False)
+        return slots, False
+
+    def _flatten_days(self, days: List[List[tuple]]) -> List[Slot]:
+        """Build the sorted slot list, reusing the Slots of days whose bookable slots are unchanged"""
+        slots = []
+        for day in days:
+            # The slot fields identify the day's output exactly
+            key = tuple(day)
+            with self._lock:
+                day_slots = self._days.get(key)
+                if day_slots is not None:
+                    self._days.move_to_end(key)
+                    self.day_hits += 1
+            if day_slots is None:
+                day_slots = sorted((_slot_from_fields(fields) for fields in day), key=lambda slot: slot.start_time)
+                with self._lock:
+                    self.day_misses += 1
+                    self._days[key] = day_slots
+                    while len(self._days) > self.max_days:
+                        self._days.popitem(last=False)
+            slots.extend(day_slots)
+
+        # Days are already in order, so this is a linear check rather than a real sort
+        slots.sort(key=lambda slot: slot.start_time)
+        return slots
+
+
+def _slot_from_fields(fields: tuple) -> Slot:
+    """Slot from the (start, end, duration, id, durations) tuple of a bookable slot"""
+    start_time, end_time, duration, slot_id, durations = fields
+    return Slot(start_time, end_time, duration, 'Bookable', slot_id, durations)
+
+
+def _slot_dict(slot: Dict[str, Any]) -> Slot:
+    """Map a raw PerfectGym slot object to a flattened Slot"""
+    return Slot(slot.get('StartTime'), slot.get('EndTime'), slot.get('BookingDuration'), slot.get('Status'),
+                slot.get('Id'), slot.get('Durations', []))
+
+
+# Shared by every client in the process (the schedule payload does not depend on the user)
+shared_parse_memo = ParsedScheduleMemo()
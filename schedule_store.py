@@ -0,0 +1,165 @@
+"""
+Persistent on-disk schedule snapshots (SQLite, WAL mode)
+
+Lets a restarted process or a new Streamlit replica serve its first schedule
+page from disk instead of waiting for an upstream round trip. Several app
+processes can share one database file.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+from schedule_parser import Slot
+
+
+class ScheduleStore:
+    """Per-day schedule rows with fetch timestamps and TTL-based invalidation"""
+
+    def __init__(self, db_file: str = "schedule_cache.db", ttl: float = 300.0):
+        """
+        Args:
+            db_file: SQLite database file shared by all app processes
+            ttl: Seconds a stored day stays valid after it was fetched
+        """
+        self.db_file = Path(db_file)
+        self.ttl = ttl
+        self._local = threading.local()
+        # The file is created on first use, not on import (scripts that never read a schedule leave no file)
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the current thread (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._init_db(conn)
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self, conn: sqlite3.Connection) -> None:
+        """Create the schedule table if it doesn't exist (once per store)"""
+        with self._init_lock:
+            if self._initialized:
+                return
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS schedule_days (
+                        club_id INTEGER NOT NULL,
+                        zone_type_id INTEGER NOT NULL,
+                        day TEXT NOT NULL,
+                        slots TEXT NOT NULL,
+                        fetched_at REAL NOT NULL,
+                        PRIMARY KEY (club_id, zone_type_id, day)
+                    )
+                """)
+            self._initialized = True
+
+    def load(self, club_id: int, zone_type_id: int, first_day: date, days: int,
+             max_age: Optional[float] = None) -> Optional[Tuple[List[Slot], float]]:
+        """
+        Load a stored window if every day in it is present and fresh
+
+        Args:
+            club_id: Club the schedule belongs to
+            zone_type_id: Zone type (e.g. badminton courts)
+            first_day: First day of the window
+            days: Number of days in the window
+            max_age: Oldest acceptable row in seconds (defaults to the TTL; larger values
+                serve stale rows, e.g. while PerfectGym is unreachable)
+
+        Returns:
+            Tuple of (sorted slots, oldest fetch time as epoch seconds), or None on a miss
+        """
+        last_day = first_day + timedelta(days=days - 1)
+        rows = self._connect().execute(
+            "SELECT slots, fetched_at FROM schedule_days "
+            "WHERE club_id = ? AND zone_type_id = ? AND day BETWEEN ? AND ? AND fetched_at >= ? "
+            "ORDER BY day",
+            (club_id, zone_type_id, first_day.isoformat(), last_day.isoformat(),
+             time.time() - (self.ttl if max_age is None else max_age))
+        ).fetchall()
+
+        if len(rows) != days:
+            return None
+
+        slots = []
+        for day_slots, _ in rows:
+            slots.extend(Slot.from_dict(slot) for slot in json.loads(day_slots))
+        return slots, min(fetched_at for _, fetched_at in rows)
+
+    def save(self, club_id: int, zone_type_id: int, first_day: date, days: int,
+             slots: List[Slot], fetched_at: Optional[float] = None) -> None:
+        """
+        Store a fetched window as one row per day (days without slots are stored empty)
+
+        Args:
+            club_id: Club the schedule belongs to
+            zone_type_id: Zone type (e.g. badminton courts)
+            first_day: First day of the window
+            days: Number of days in the window
+            slots: Sorted slots covering the window
+            fetched_at: Epoch seconds of the fetch (defaults to now)
+        """
+        fetched_at = fetched_at or time.time()
+        by_day = {(first_day + timedelta(days=offset)).isoformat(): [] for offset in range(days)}
+        for slot in slots:
+            day_slots = by_day.get(slot['start_time'][:10])
+            if day_slots is not None:
+                day_slots.append(slot)
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO schedule_days (club_id, zone_type_id, day, slots, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(club_id, zone_type_id, day, json.dumps([dict(slot) for slot in day_slots]), fetched_at)
+                 for day, day_slots in by_day.items()]
+            )
+
+    def touch(self, club_id: int, zone_type_id: int, first_day: date, days: int, fetched_at: float,
+              expected_fetched_at: float) -> bool:
+        """
+        Mark a stored window as fetched again with unchanged content (no slot rewrite)
+
+        Only rows still stamped expected_fetched_at (the fetch time of the copy the caller
+        holds) are touched. Any other row was rewritten since, possibly by another process
+        with different slots, and marking it fresh would pass off that content as confirmed.
+
+        Returns:
+            True if every day of the window was touched; otherwise save the window instead
+        """
+        last_day = first_day + timedelta(days=days - 1)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE schedule_days SET fetched_at = ? "
+                "WHERE club_id = ? AND zone_type_id = ? AND day BETWEEN ? AND ? AND fetched_at = ?",
+                (fetched_at, club_id, zone_type_id, first_day.isoformat(), last_day.isoformat(),
+                 expected_fetched_at)
+            )
+        return cursor.rowcount == days
+
+    def purge(self, before_day: Optional[date] = None) -> None:
+        """Delete expired rows and, optionally, every day before before_day"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM schedule_days WHERE fetched_at < ?", (time.time() - self.ttl,))
+            if before_day:
+                conn.execute("DELETE FROM schedule_days WHERE day < ?", (before_day.isoformat(),))
+
+
+def _shared_store() -> Optional[ScheduleStore]:
+    db_file = os.getenv("SCHEDULE_STORE_FILE", "schedule_cache.db")
+    if not db_file:
+        return None
+    # Opened on first use; callers handle sqlite3.Error from every read and write
+    return ScheduleStore(db_file, ttl=float(os.getenv("SCHEDULE_STORE_TTL", "300")))
+
+
+# Shared by all clients in this process (and, through the file, by other processes)
+shared_schedule_store = _shared_store()
@@ -0,0 +1,142 @@
+"""
+Background schedule warmer
+
+Keeps the next N days of GetWeeklySchedule data fresh in the shared schedule
+cache (and the on-disk store), so the schedule page and chat only ever read the
+warm copy and never wait on PerfectGym themselves.
+
+Run in-process (see app.get_schedule_warmer) or as a separate service that
+fills the shared SQLite store for every app process:
+    PERFECTGYM_EMAIL=... PERFECTGYM_PASSWORD=... python schedule_warmer.py
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from perfectgym_client import PerfectGymClient
+from schedule_cache import set_warm_horizon
+
+load_dotenv()
+
+
+class ScheduleWarmer:
+    """Refreshes a client's schedule on a fixed cadence in a daemon thread"""
+
+    def __init__(self, client: PerfectGymClient, days: int = 14, interval: float = 45.0,
+                 email: Optional[str] = None, password: Optional[str] = None,
+                 login_retry: float = 60.0, login_retry_max: float = 3600.0):
+        """
+        Args:
+            client: Client used for the refreshes (dedicated to the warmer)
+            days: Number of days from today to keep warm
+            interval: Seconds between refreshes; keep it below SCHEDULE_CACHE_TTL
+            email: Service account to log the client in with on the warmer thread
+                (None if the client is already logged in)
+            password: Password of the service account
+            login_retry: Seconds to wait after a failed login; doubled after each further
+                failure, so bad credentials don't hammer PerfectGym or lock the account
+            login_retry_max: Longest wait between login attempts in seconds
+        """
+        self.client = client
+        self.days = days
+        self.interval = interval
+        self.email = email
+        self.password = password
+        self.login_retry = login_retry
+        self.login_retry_max = login_retry_max
+        self.login_failures = 0
+        self.last_refresh: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Log in if needed, refresh once, then keep refreshing, all on a background thread"""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="schedule-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop refreshing; readers fall back to fetching on demand"""
+        self._stop.set()
+        set_warm_horizon(self.client.club_id, self.client.zone_type_id, None)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def refresh_once(self) -> bool:
+        """Fetch the warm window now; returns True on success"""
+        if self.client.refresh_schedule(self.days):
+            self.last_refresh = datetime.now()
+            self.last_error = None
+            # Only advertise the warm copy once it actually exists
+            set_warm_horizon(self.client.club_id, self.client.zone_type_id, self.days)
+            return True
+
+        self.last_error = "Schedule refresh failed"
+        print(f"Schedule warmer: refresh failed at {datetime.now().strftime('%H:%M:%S')}")
+        return False
+
+    def _login(self) -> bool:
+        """Log the service account in, waiting longer after each failure; False once stopped"""
+        while not self._stop.is_set():
+            if self.client.login(self.email, self.password):
+                self.login_failures = 0
+                return True
+
+            delay = min(self.login_retry_max, self.login_retry * 2 ** self.login_failures)
+            self.login_failures += 1
+            self.last_error = "Service account login failed"
+            print(f"Schedule warmer: service account login failed, retrying in {delay:.0f}s")
+            self._stop.wait(delay)
+        return False
+
+    def _run(self) -> None:
+        if self.email and not self._login():
+            return
+
+        delay = 0.0  # the first refresh runs right away
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.refresh_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Schedule warmer error: {e}")
+
+
+def main() -> None:
+    """Run the warmer as a standalone service feeding the shared schedule store"""
+    email = os.getenv("PERFECTGYM_EMAIL")
+    password = os.getenv("PERFECTGYM_PASSWORD")
+    if not email or not password:
+        print("Set PERFECTGYM_EMAIL and PERFECTGYM_PASSWORD to run the schedule warmer")
+        return
+
+    warmer = ScheduleWarmer(
+        PerfectGymClient(),
+        days=int(os.getenv("WARMER_DAYS", "14")),
+        interval=float(os.getenv("WARMER_INTERVAL", "45")),
+        email=email,
+        password=password
+    )
+    warmer.start()
+    print(f"Schedule warmer running: {warmer.days} days every {warmer.interval:.0f}s (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        warmer.stop()
+
+
+if __name__ == "__main__":
+    main()
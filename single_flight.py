@@ -0,0 +1,63 @@
+"""
+Single-flight coalescing of concurrent identical calls
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """A call in progress that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Ensures only one call per key is in flight; concurrent callers share its result"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn for key, or wait for the call already running for key
+
+        Args:
+            key: Identifies identical calls (e.g. endpoint and payload)
+            fn: Zero-argument function performing the call
+
+        Returns:
+            The result of fn, shared by every caller that joined the flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether a call for key is currently running"""
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,111 @@
+"""
+Time-range index over a fetched schedule
+
+Built once per fetch (see ScheduleSnapshot.index) and shared by every caller,
+so chat turns and schedule page reruns answer range, weekday/time-of-day and
+"next free slot" lookups with binary searches instead of re-parsing every slot.
+"""
+import time
+from datetime import datetime, date as date_type, time as time_type, timedelta
+from typing import Optional, List, Union
+
+import numpy as np
+
+from schedule_parser import Slot
+from slot_table import SlotTable, SECONDS_PER_DAY, to_epoch
+
+# 1970-01-01 was a Thursday (weekday 3 with Monday = 0)
+_EPOCH_WEEKDAY = 3
+
+
+def _seconds(t: time_type) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+class SlotIndex:
+    """Binary-search index over slots sorted by start time"""
+
+    def __init__(self, slots: List[Slot], table: Optional[SlotTable] = None,
+                 fetched_at: Optional[float] = None):
+        """
+        Args:
+            slots: Slots, sorted by start time if a table is given (as produced by flatten_schedule)
+            table: Columnar view of the same slots in the same order, built if not given
+            fetched_at: Epoch seconds when the slots were fetched (defaults to now)
+        """
+        if table is None:
+            # The table comes out sorted by start time: the slots must be in the same order
+            slots = sorted(slots, key=lambda slot: slot.start_time)
+            table = SlotTable.from_slots(slots)
+        self.slots = slots
+        self.fetched_at = fetched_at or time.time()
+        self.table = table
+        starts = self.table.starts
+
+        # Per weekday: row numbers ordered by (time of day, start) and the matching time-of-day keys
+        days = starts // SECONDS_PER_DAY
+        weekdays = (days + _EPOCH_WEEKDAY) % 7
+        time_of_day = starts - days * SECONDS_PER_DAY
+        self._by_weekday = []
+        for weekday in range(7):
+            rows = np.flatnonzero(weekdays == weekday)
+            rows = rows[np.lexsort((starts[rows], time_of_day[rows]))]
+            self._by_weekday.append((rows, time_of_day[rows]))
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the indexed slots were fetched"""
+        return time.time() - self.fetched_at
+
+    def _rows(self, rows) -> List[Slot]:
+        return [self.slots[i] for i in rows]
+
+    def between(self, start: Union[datetime, date_type], end: Union[datetime, date_type]) -> List[Slot]:
+        """Slots starting in [start, end)"""
+        lo = np.searchsorted(self.table.starts, to_epoch(start), side='left')
+        hi = np.searchsorted(self.table.starts, to_epoch(end), side='left')
+        return self.slots[lo:hi]
+
+    def on_date(self, day: Union[datetime, date_type], start: Optional[time_type] = None,
+                end: Optional[time_type] = None, days: int = 1) -> List[Slot]:
+        """
+        Slots on the given day (or the following days - 1 days as well), optionally
+        limited to start times in [start, end) on each day
+
+        Args:
+            day: First day to include
+            start: Earliest start time of day (defaults to midnight)
+            end: Latest start time of day, exclusive (defaults to end of day)
+            days: Number of consecutive days to include
+        """
+        if isinstance(day, datetime):
+            day = day.date()
+        first = datetime.combine(day, time_type.min)
+        if start is None and end is None:
+            return self.between(first, first + timedelta(days=days))
+
+        start_offset = timedelta(seconds=_seconds(start)) if start else timedelta(0)
+        end_offset = timedelta(seconds=_seconds(end)) if end else timedelta(days=1)
+        matches = []
+        for offset in range(days):
+            midnight = first + timedelta(days=offset)
+            matches.extend(self.between(midnight + start_offset, midnight + end_offset))
+        return matches
+
+    def weekday_window(self, weekday: int, start: time_type, end: time_type) -> List[Slot]:
+        """
+        Slots on a weekday (Monday = 0) whose start time of day falls in [start, end),
+        across every week in the index, ordered by start time
+        """
+        rows, keys = self._by_weekday[weekday]
+        lo = np.searchsorted(keys, _seconds(start), side='left')
+        hi = np.searchsorted(keys, _seconds(end), side='left')
+        return self._rows(np.sort(rows[lo:hi]))
+
+    def first_after(self, moment: Union[datetime, date_type]) -> Optional[Slot]:
+        """First bookable slot starting at or after moment, or None"""
+        i = np.searchsorted(self.table.starts, to_epoch(moment), side='left')
+        return self.slots[i] if i < len(self.slots) else None
@@ -0,0 +1,180 @@
+"""
+Columnar storage for bookable slots
+
+Times are stored as int64 wall-clock epoch seconds (the naive local times
+PerfectGym returns, read as if they were UTC), so date and time-of-day
+filters are plain integer arithmetic on whole columns. Timestamps carrying a
+UTC offset can't be stored that way and are rejected rather than shifted.
+"""
+from datetime import datetime, date as date_type, time as time_type, timedelta
+from typing import Any, Optional, List, Iterable, Union
+
+import numpy as np
+
+from schedule_parser import Slot, iso_duration_minutes, minutes_to_iso_duration
+
+SECONDS_PER_DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(dt: Union[datetime, date_type]) -> int:
+    """Convert a naive datetime (or date, at midnight) to wall-clock epoch seconds"""
+    if not isinstance(dt, datetime):
+        dt = datetime.combine(dt, time_type.min)
+    return int((dt.replace(tzinfo=None) - EPOCH).total_seconds())
+
+
+def from_epoch(seconds: int) -> datetime:
+    """Convert wall-clock epoch seconds back to a naive datetime"""
+    return EPOCH + timedelta(seconds=int(seconds))
+
+
+def _check_wall_clock(value: Optional[str], field: str) -> None:
+    """Raise ValueError unless value is a naive ISO timestamp (no Z / +HH:MM / -HH:MM suffix)"""
+    if not isinstance(value, str):
+        raise ValueError(f"Slot {field} is missing: {value!r}")
+    # The date part holds the only dashes of a naive timestamp
+    suffix = value[10:]
+    if 'Z' in suffix or '+' in suffix or '-' in suffix:
+        raise ValueError(f"Slot {field} has a UTC offset, expected PerfectGym's naive local time: {value!r}")
+
+
+def _slot_id(value: Any) -> int:
+    """Slot id for the int64 id column: -1 stands for no id, anything but an int is an error"""
+    if value is None:
+        return -1
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"Slot id must be an int, got {value!r}")
+    return value
+
+
+def _time_of_day_seconds(t: time_type) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+class SlotTable:
+    """Compact, start-time-sorted columns of bookable slots with vectorized filters"""
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, durations: np.ndarray, ids: np.ndarray,
+                 available_durations: Optional[List[tuple]] = None):
+        """
+        Args:
+            starts: int64 epoch seconds of each slot start, sorted ascending
+            ends: int64 epoch seconds of each slot end
+            durations: int32 booking duration in minutes
+            ids: int64 slot ids (-1 where PerfectGym sent none)
+            available_durations: Optional per-slot tuples of ISO durations (shared, interned)
+        """
+        self.starts = starts
+        self.ends = ends
+        self.durations = durations
+        self.ids = ids
+        self.available_durations = available_durations
+
+    @classmethod
+    def from_slots(cls, slots: Iterable[Slot]) -> "SlotTable":
+        """
+        Build a table from flattened Slots (as returned by get_schedule)
+
+        Raises:
+            ValueError: If a slot has a missing or offset-bearing time, or an id that isn't an int
+        """
+        slots = list(slots)
+        if not slots:
+            return cls.empty()
+
+        duration_cache = {}
+        durations = np.empty(len(slots), dtype=np.int32)
+        ids = np.empty(len(slots), dtype=np.int64)
+        interned = {}
+        available = []
+        for i, s in enumerate(slots):
+            # Checked before numpy parses the strings: it would shift offset times to UTC silently
+            _check_wall_clock(s['start_time'], 'start_time')
+            _check_wall_clock(s['end_time'], 'end_time')
+            iso = s.get('duration')
+            if iso not in duration_cache:
+                duration_cache[iso] = iso_duration_minutes(iso)
+            durations[i] = duration_cache[iso]
+            ids[i] = _slot_id(s.get('id'))
+            options = tuple(s.get('available_durations') or ())
+            available.append(interned.setdefault(options, options))
+
+        starts = np.array([s['start_time'] for s in slots], dtype='datetime64[s]').astype(np.int64)
+        ends = np.array([s['end_time'] for s in slots], dtype='datetime64[s]').astype(np.int64)
+
+        order = np.argsort(starts, kind='stable')
+        return cls(starts[order], ends[order], durations[order], ids[order],
+                   [available[i] for i in order])
+
+    @classmethod
+    def empty(cls) -> "SlotTable":
+        """A table with no slots"""
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                   np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64), [])
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the numeric columns"""
+        return self.starts.nbytes + self.ends.nbytes + self.durations.nbytes + self.ids.nbytes
+
+    def _take(self, selector) -> "SlotTable":
+        """New table holding the rows picked by a slice, index array or boolean mask"""
+        available = None
+        if self.available_durations is not None:
+            if isinstance(selector, slice):
+                available = self.available_durations[selector]
+            else:
+                picked = np.arange(len(self))[selector]
+                available = [self.available_durations[i] for i in picked]
+        return SlotTable(self.starts[selector], self.ends[selector], self.durations[selector],
+                         self.ids[selector], available)
+
+    def between(self, start: Union[datetime, date_type], end: Union[datetime, date_type]) -> "SlotTable":
+        """Slots starting in [start, end); a binary search on the sorted start column"""
+        lo = np.searchsorted(self.starts, to_epoch(start), side='left')
+        hi = np.searchsorted(self.starts, to_epoch(end), side='left')
+        return self._take(slice(lo, hi))
+
+    def on_dates(self, first_day: Union[datetime, date_type], days: int = 1) -> "SlotTable":
+        """Slots starting on first_day or any of the following days - 1 days"""
+        if isinstance(first_day, datetime):
+            first_day = first_day.date()
+        return self.between(first_day, first_day + timedelta(days=days))
+
+    def time_of_day(self, start: time_type, end: time_type) -> "SlotTable":
+        """Slots whose start time-of-day falls in [start, end)"""
+        seconds = self.starts % SECONDS_PER_DAY
+        mask = (seconds >= _time_of_day_seconds(start)) & (seconds < _time_of_day_seconds(end))
+        return self._take(mask)
+
+    def min_duration(self, minutes: int) -> "SlotTable":
+        """Slots whose booking duration is at least the given number of minutes"""
+        return self._take(self.durations >= minutes)
+
+    def start_datetime(self, i: int) -> datetime:
+        """Start of row i as a naive datetime"""
+        return from_epoch(self.starts[i])
+
+    def end_datetime(self, i: int) -> datetime:
+        """End of row i as a naive datetime"""
+        return from_epoch(self.ends[i])
+
+    def to_slots(self) -> List[Slot]:
+        """Expand back into the Slots returned by get_schedule"""
+        slots = []
+        for i in range(len(self)):
+            duration = int(self.durations[i])
+            slot_id = int(self.ids[i])
+            slots.append(Slot(
+                self.start_datetime(i).isoformat(),
+                self.end_datetime(i).isoformat(),
+                minutes_to_iso_duration(duration),
+                'Bookable',
+                slot_id if slot_id >= 0 else None,
+                self.available_durations[i] if self.available_durations is not None else ()
+            ))
+        return slots
@@ -0,0 +1,189 @@
+"""
+Tests for AsyncPerfectGymClient against a local stand-in PerfectGym server
+"""
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from async_perfectgym_client import AsyncPerfectGymClient
+from resilience import ResiliencePolicy
+from schedule_cache import shared_schedule_cache
+
+EMAIL = "player@example.com"
+PASSWORD = "secret"
+
+
+class StandIn:
+    """State of the stand-in server: issued tokens and requests received per path"""
+
+    def __init__(self):
+        self.token = None
+        self.logins = 0
+        self.requests = {}
+        self.schedule_delay = 0.0
+        self.failing = False  # answer everything but logins with 500
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        slots = []
+        for i, (hour, status) in enumerate([(18, "Bookable"), (19, "Booked"), (20, "Bookable")]):
+            start = datetime.combine(tomorrow, datetime.min.time()) + timedelta(hours=hour)
+            slots.append({"StartTime": start.isoformat(), "EndTime": (start + timedelta(minutes=30)).isoformat(),
+                          "BookingDuration": "PT30M", "Status": status, "Id": 100 + i, "Durations": ["PT30M"]})
+        self.schedule = json.dumps({"CalendarData": [{"ClassesPerDay": [[], slots]}]}).encode()
+
+
+def _handler(state: StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict = None, headers: dict = None):
+            data = json.dumps(body or {}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _authorized(self) -> bool:
+            return state.token is not None and self.headers.get("Authorization") == f"Bearer {state.token}"
+
+        def _handle(self):
+            path = self.path.split("?")[0]
+            state.requests[path] = state.requests.get(path, 0) + 1
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+
+            if path == "/ClientPortal2/Auth/Login":
+                if body.get("Login") != EMAIL or body.get("Password") != PASSWORD:
+                    return self._send(401)
+                state.logins += 1
+                state.token = f"token-{state.logins}"
+                member = {"Id": 7, "Email": EMAIL, "FirstName": "Test", "LastName": "Player"}
+                return self._send(200, {"User": {"Member": member}},
+                                  {"Set-Cookie": f"CpAuthToken={state.token}; Path=/"})
+            if state.failing:
+                return self._send(500)
+            if not self._authorized():
+                return self._send(401)
+            if path.endswith("/GetWeeklySchedule"):
+                threading.Event().wait(state.schedule_delay)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(state.schedule)))
+                self.end_headers()
+                return self.wfile.write(state.schedule)
+            if path.endswith("/BookFacility/Start"):
+                return self._send(200)
+            if path.endswith("/SetFacilityBookingDetailsWizardStep/Next"):
+                return self._send(200, {"Data": {"RuleId": 55}})
+            if path.endswith("/ChooseBookingRuleStep/Next"):
+                booking = {"StartDate": "2030-01-01T18:00:00", "Duration": 30,
+                           "User": {"FirstName": "Test", "LastName": "Player"}}
+                return self._send(200, {"Data": {"FacilityBooking": booking}})
+            if path == "/Api/FacilityBooking/MyBookings":
+                return self._send(200, [{"Id": 1}])
+            return self._send(404)
+
+        do_GET = do_POST = _handle
+
+    return Handler
+
+
+@pytest.fixture
+def server():
+    state = StandIn()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler(state))
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    shared_schedule_cache.invalidate()
+    state.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+    shared_schedule_cache.invalidate()
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_login_and_schedule(server):
+    async def scenario():
+        async with AsyncPerfectGymClient(base_url=server.base_url) as client:
+            assert await client.login(EMAIL, PASSWORD)
+            return await client.get_schedule(days=7)
+
+    slots = _run(scenario())
+    assert [slot['id'] for slot in slots] == [100, 102]
+    assert slots[0].duration_minutes == 30
+
+
+def test_wrong_password_fails(server):
+    async def scenario():
+        async with AsyncPerfectGymClient(base_url=server.base_url) as client:
+            return await client.login(EMAIL, "wrong")
+
+    assert not _run(scenario())
+
+
+def test_expired_token_triggers_one_relogin(server):
+    async def scenario():
+        async with AsyncPerfectGymClient(base_url=server.base_url) as client:
+            await client.login(EMAIL, PASSWORD)
+            server.token = "rotated-by-server"
+            return await client.get_my_bookings()
+
+    assert _run(scenario()) == [{"Id": 1}]
+    assert server.logins == 2
+
+
+def test_concurrent_schedule_reads_share_one_request(server):
+    server.schedule_delay = 0.2
+
+    async def scenario():
+        async with AsyncPerfectGymClient(base_url=server.base_url) as client:
+            await client.login(EMAIL, PASSWORD)
+            return await asyncio.gather(*(client.get_schedule(days=7) for _ in range(5)))
+
+    results = _run(scenario())
+    assert all(len(slots) == 2 for slots in results)
+    assert server.requests["/ClientPortal2/FacilityBookings/FacilityCalendar/GetWeeklySchedule"] == 1
+
+
+def test_booking_wizard(server):
+    async def scenario():
+        async with AsyncPerfectGymClient(base_url=server.base_url) as client:
+            client.wizard_step_delay = 0
+            await client.login(EMAIL, PASSWORD)
+            return await client.book_court(90, datetime(2030, 1, 1, 18, 0))
+
+    result = _run(scenario())
+    assert result["success"], result
+    assert result["user"] == "Test Player"
+
+
+def test_failing_upstream_serves_last_schedule_and_bookings_flagged_stale(server):
+    async def scenario():
+        async with AsyncPerfectGymClient(base_url=server.base_url) as client:
+            client.resilience = ResiliencePolicy()  # keep this test's failures out of the shared breakers
+            await client.login(EMAIL, PASSWORD)
+            fresh = await client.get_schedule(days=7)
+            bookings = await client.get_my_bookings()
+
+            # Expire the cached schedule, then let PerfectGym fail
+            key = (client.club_id, client.zone_type_id, 7)
+            snapshot, _ = shared_schedule_cache.get_stale(key)
+            snapshot.fetched_at -= shared_schedule_cache.ttl + 1
+            shared_schedule_cache.put(key, snapshot, age=snapshot.age)
+            server.failing = True
+            return fresh, bookings, await client.get_schedule(days=7), await client.get_my_bookings()
+
+    fresh, bookings, stale, stale_bookings = _run(scenario())
+    assert not fresh.stale and not bookings.stale
+    assert stale == fresh and stale.stale
+    assert stale_bookings == bookings and stale_bookings.stale
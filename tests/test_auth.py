@@ -0,0 +1,68 @@
+"""
+Tests for user accounts and signed session tokens
+"""
+import pytest
+
+import auth
+from auth import UserAuth
+
+SECRET = "s" * 32
+
+
+@pytest.fixture
+def users(tmp_path):
+    user_auth = UserAuth(str(tmp_path / "users.db"), legacy_users_file=str(tmp_path / "users.json"),
+                         rounds=4, session_secret=SECRET, session_ttl=60)
+    assert user_auth.register_user("alice", "hunter2")
+    return user_auth
+
+
+def test_token_round_trip(users):
+    token = users.issue_session_token("alice")
+    assert users.verify_session_token(token) == "alice"
+
+
+def test_tampered_token_is_rejected(users):
+    body, signature = users.issue_session_token("alice").split(".")
+
+    assert users.verify_session_token(f"{body}.{signature[::-1]}") is None
+    assert users.verify_session_token(f"{body}x.{signature}") is None
+    assert users.verify_session_token(f"{body}.") is None
+    assert users.verify_session_token("") is None
+    assert users.verify_session_token("no-dot") is None
+
+
+def test_non_ascii_signature_is_rejected(users):
+    body = users.issue_session_token("alice").split(".")[0]
+    assert users.verify_session_token(f"{body}.sïgnature") is None
+
+
+def test_token_from_another_secret_is_rejected(users):
+    other = UserAuth(str(users.db_file), rounds=4, session_secret="o" * 32, session_ttl=60)
+    assert users.verify_session_token(other.issue_session_token("alice")) is None
+
+
+def test_expired_token_is_rejected(users, monkeypatch):
+    token = users.issue_session_token("alice")
+    now = auth.time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + 61)
+    assert users.verify_session_token(token) is None
+
+
+def test_password_change_revokes_tokens(users):
+    token = users.issue_session_token("alice")
+    assert users.change_password("alice", "hunter2", "correct horse")
+
+    assert users.verify_session_token(token) is None
+    assert users.verify_session_token(users.issue_session_token("alice")) == "alice"
+
+
+def test_token_for_unknown_user_is_rejected(users):
+    assert users.verify_session_token(users.issue_session_token("mallory")) is None
+
+
+@pytest.mark.parametrize("secret", ["your-session-secret-here", "too-short"])
+def test_guessable_session_secret_is_refused(tmp_path, secret):
+    with pytest.raises(ValueError):
+        UserAuth(str(tmp_path / "users.db"), legacy_users_file=str(tmp_path / "users.json"),
+                 rounds=4, session_secret=secret)
@@ -0,0 +1,107 @@
+"""
+Tests for the pool of logged-in PerfectGym clients
+"""
+from client_pool import ClientPool
+
+PASSWORDS = {"a@example.com": "right", "b@example.com": "right", "c@example.com": "right"}
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """Stands in for PerfectGymClient: logins succeed with the password in PASSWORDS"""
+
+    def __init__(self):
+        self.session = FakeSession()
+        self.logged_in = False
+        self.logged_out = False
+
+    def login(self, email: str, password: str) -> bool:
+        self.logged_in = PASSWORDS.get(email) == password
+        return self.logged_in
+
+    def is_session_valid(self) -> bool:
+        return self.logged_in
+
+    def logout(self) -> None:
+        self.logged_in = False
+        self.logged_out = True
+
+
+def _pool(**kwargs) -> ClientPool:
+    return ClientPool(client_factory=FakeClient, **kwargs)
+
+
+def test_sessions_of_one_account_share_a_login():
+    pool = _pool()
+    first = pool.acquire("a@example.com", "right", "tab-1")
+    second = pool.acquire("A@example.com ", "right", "tab-2")
+
+    assert first is second
+    assert pool.stats() == {"clients": 1, "leases": 2, "logins": 1, "reuses": 1}
+
+
+def test_failed_login_is_not_pooled():
+    pool = _pool()
+    assert pool.acquire("a@example.com", "wrong", "tab-1") is None
+    assert pool.stats()["clients"] == 0
+
+
+def test_wrong_password_leaves_the_live_client_alone():
+    pool = _pool()
+    client = pool.acquire("a@example.com", "right", "victim")
+
+    assert pool.acquire("a@example.com", "wrong", "attacker") is None
+    assert client.is_session_valid() and not client.logged_out
+    assert pool.acquire("a@example.com", "right", "victim") is client
+
+
+def test_new_password_replaces_the_client_after_it_logs_in():
+    pool = _pool()
+    old = pool.acquire("a@example.com", "right", "tab-1")
+    PASSWORDS["a@example.com"] = "changed"
+    try:
+        new = pool.acquire("a@example.com", "changed", "tab-1")
+    finally:
+        PASSWORDS["a@example.com"] = "right"
+
+    assert new is not old and new.is_session_valid()
+    assert old.logged_out and old.session.closed
+    assert pool.stats()["clients"] == 1
+
+
+def test_full_pool_evicts_least_recently_used_unleased_client():
+    pool = _pool(max_clients=2)
+    a = pool.acquire("a@example.com", "right", "tab-a")
+    pool.acquire("b@example.com", "right", "tab-b")
+
+    assert pool.acquire("c@example.com", "right", "tab-c") is None  # every client is leased
+
+    pool.release("a@example.com", "tab-a")
+    assert pool.acquire("c@example.com", "right", "tab-c") is not None
+    assert a.logged_out
+    assert pool.stats()["clients"] == 2
+
+
+def test_idle_leases_lapse_and_idle_clients_are_evicted():
+    pool = _pool(idle_timeout=0)
+    a = pool.acquire("a@example.com", "right", "tab-a")
+    pool.acquire("b@example.com", "right", "tab-b")
+
+    assert a.logged_out
+    assert pool.stats()["clients"] == 1
+
+
+def test_evict_logs_out_regardless_of_leases():
+    pool = _pool()
+    client = pool.acquire("a@example.com", "right", "tab-1")
+    pool.evict("a@example.com")
+
+    assert client.logged_out
+    assert pool.stats()["clients"] == 0
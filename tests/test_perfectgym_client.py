@@ -0,0 +1,133 @@
+"""
+Tests for the synchronous PerfectGym client: schedule caching and session refresh
+"""
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from perfectgym_client import PerfectGymClient
+from schedule_cache import ScheduleCache
+from schedule_parser import Slot
+from schedule_store import ScheduleStore
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = PerfectGymClient()
+    client.schedule_cache = ScheduleCache(ttl=60)
+    client.schedule_store = ScheduleStore(str(tmp_path / "schedule.db"), ttl=300)
+    yield client
+    client.session.close()
+
+
+def _save_today(client, age: float):
+    today = datetime.now().date()
+    slots = [Slot(f'{today}T18:00:00', f'{today}T18:30:00', 'PT30M', 'Bookable', 1, ['PT30M'])]
+    client.schedule_store.save(client.club_id, client.zone_type_id, today, 1, slots,
+                               fetched_at=time.time() - age)
+
+
+def test_stored_rows_past_the_cache_ttl_are_revalidated(client, monkeypatch):
+    _save_today(client, age=200)
+    revalidated = []
+    monkeypatch.setattr(client, "_revalidate", lambda *args: revalidated.append(args))
+    monkeypatch.setattr(client, "_fetch_snapshot", lambda *args: pytest.fail("fetched in the foreground"))
+
+    schedule = client.get_schedule(days=1)
+
+    assert len(schedule) == 1 and schedule.stale
+    assert len(revalidated) == 1
+
+
+def test_stored_rows_within_the_cache_ttl_are_a_hit(client, monkeypatch):
+    _save_today(client, age=10)
+    monkeypatch.setattr(client, "_revalidate", lambda *args: pytest.fail("revalidated a fresh copy"))
+
+    schedule = client.get_schedule(days=1)
+
+    assert len(schedule) == 1 and not schedule.stale
+
+
+class FakeLoginResponse:
+    status_code = 200
+
+    def json(self):
+        return {"User": {"Member": {"Id": 7, "Email": "player@example.com", "FirstName": "Test", "LastName": "Player"}}}
+
+
+def _short_lived_token(seconds: float) -> str:
+    claims = json.dumps({"exp": time.time() + seconds}).encode()
+    return "e30." + base64.urlsafe_b64encode(claims).decode().rstrip("=") + ".sig"
+
+
+def test_refresh_logins_do_not_count_as_use(monkeypatch):
+    client = PerfectGymClient()
+    client.auto_refresh = False  # the timer callback is driven by hand below
+    client.refresh_margin = 120  # more than the token lives: every refresh is due at once
+    client.refresh_idle_limit = 60
+    logins = []
+
+    def post(url, **kwargs):
+        logins.append(url)
+        client.session.cookies.set("CpAuthToken", _short_lived_token(30))
+        return FakeLoginResponse()
+
+    monkeypatch.setattr(client.session, "post", post)
+    assert client.login("player@example.com", "secret")
+
+    # Never used since login: nothing to keep alive
+    client._proactive_refresh(client._auth_generation)
+    assert len(logins) == 1
+
+    used_at = datetime.now() - timedelta(seconds=30)
+    client.last_used = used_at
+    client._proactive_refresh(client._auth_generation)
+    assert len(logins) == 2
+    assert client.last_used == used_at
+
+    # The refresh moved last_activity, but the client has now been idle past the limit
+    client.last_used = datetime.now() - timedelta(seconds=61)
+    client._proactive_refresh(client._auth_generation)
+    assert len(logins) == 2
+    client.session.close()
+
+
+class FakeResponse:
+    status_code = 401
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_failed_coalesced_request_closes_its_response(monkeypatch):
+    client = PerfectGymClient()
+    response = FakeResponse()
+    monkeypatch.setattr(client, "_make_request_with_retry", lambda *args, **kwargs: (False, response))
+
+    assert client._coalesced_request('GET', client.base_url + "/Api/Test", lambda r: r, stream=True) is None
+    assert response.closed
+    client.session.close()
+
+
+def test_bookings_fall_back_to_the_last_ones_seen_when_relogin_fails(monkeypatch):
+    client = PerfectGymClient()
+    client.email, client.password = "player@example.com", "secret"
+    monkeypatch.setattr(client, "_refresh_login", lambda *args: False)
+
+    bookings = client.get_my_bookings()
+    assert bookings == [] and bookings.stale
+
+    monkeypatch.setattr(client, "is_session_valid", lambda: True)
+    monkeypatch.setattr(client, "_coalesced_request", lambda *args, **kwargs: [{"Id": 1}])
+    assert client.get_my_bookings() == [{"Id": 1}]
+
+    monkeypatch.setattr(client, "_coalesced_request", lambda *args, **kwargs: 1 / 0)
+    bookings = client.get_my_bookings()
+    assert bookings == [{"Id": 1}] and bookings.stale and bookings.age >= 0
+    client.session.close()
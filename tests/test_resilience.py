@@ -0,0 +1,100 @@
+"""
+Tests for retry backoff, the retry budget and circuit breakers
+"""
+import pytest
+
+import resilience
+from resilience import Backoff, CircuitBreaker, ResiliencePolicy, RetryBudget, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def test_backoff_delays_stay_within_the_capped_exponential_bound():
+    backoff = Backoff(base=0.5, cap=4.0)
+    for attempt, bound in enumerate([0.5, 1.0, 2.0, 4.0, 4.0]):
+        assert all(0 <= backoff.delay(attempt) <= bound for _ in range(50))
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("/schedule", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()  # resets the count
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_open_breaker_lets_one_probe_through_after_the_reset_timeout(clock):
+    breaker = CircuitBreaker("/schedule", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("/schedule", failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_policy_counts_transitions_and_rejections(clock):
+    policy = ResiliencePolicy(failure_threshold=1, reset_timeout=30)
+    breaker = policy.breaker("/schedule")
+    assert policy.breaker("/schedule") is breaker
+
+    breaker.record_failure()
+    policy.record_rejected("/schedule")
+    metrics = policy.metrics()
+    assert metrics["breakers"] == {"/schedule": OPEN}
+    assert metrics["transitions"] == {"/schedule:closed->open": 1}
+    assert metrics["rejected"] == {"/schedule": 1}
+
+
+def test_retry_budget_allows_min_retries_plus_a_ratio_of_requests(clock):
+    budget = RetryBudget(ratio=0.5, min_retries=2, window=10)
+    for _ in range(4):
+        budget.record_request()
+
+    assert [budget.try_retry() for _ in range(5)] == [True, True, True, True, False]
+    assert budget.exhausted == 1
+
+
+def test_retry_budget_recovers_once_the_window_has_passed(clock):
+    budget = RetryBudget(ratio=0, min_retries=1, window=10)
+    assert budget.try_retry()
+    assert not budget.try_retry()
+
+    clock.now += 11
+    assert budget.try_retry()
@@ -0,0 +1,74 @@
+"""
+Tests for the process-wide schedule cache
+"""
+import time
+
+import pickle
+
+from schedule_cache import ScheduleCache, ScheduleResult, ScheduleSnapshot
+
+
+def test_get_returns_fresh_entries_and_counts_hits():
+    cache = ScheduleCache(ttl=60)
+    cache.put("week", "slots")
+
+    assert cache.get("week") == "slots"
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entries_miss_but_stay_available_as_stale():
+    cache = ScheduleCache(ttl=60)
+    cache.put("week", "slots", age=61)
+
+    assert cache.get("week") is None
+    value, age = cache.get_stale("week")
+    assert value == "slots"
+    assert 61 <= age < 62
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ScheduleCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # b is now the least recently used
+    cache.put("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get_stale("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_invalidate_one_key_or_everything():
+    cache = ScheduleCache()
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    cache.invalidate("a")
+    assert cache.get_stale("a") is None
+    assert cache.get("b") == 2
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_snapshot_touch_moves_fetched_at_forward():
+    snapshot = ScheduleSnapshot([], fetched_at=time.time() - 300)
+    assert snapshot.age >= 300
+
+    snapshot.touch()
+    assert snapshot.age < 1
+
+
+def test_schedule_result_staleness_is_judged_when_read():
+    result = ScheduleResult(["slot"], fetched_at=time.time() - 30, ttl=60)
+    assert not result.stale
+
+    # E.g. a result kept in Streamlit's data cache, read again later
+    kept = pickle.loads(pickle.dumps(result))
+    kept.fetched_at -= 40
+    assert kept.stale
+    assert 70 <= kept.age < 71
+    assert kept == ["slot"]
+    assert not ScheduleResult(["slot"], fetched_at=time.time() - 3600).stale  # no TTL, never stale
@@ -0,0 +1,45 @@
+"""
+Tests for the on-disk schedule store
+"""
+from datetime import date
+
+from schedule_parser import Slot
+from schedule_store import ScheduleStore
+
+DAY = date(2030, 1, 1)
+
+
+def _slots(hour: int = 18):
+    return [Slot(f'2030-01-01T{hour}:00:00', f'2030-01-01T{hour}:30:00', 'PT30M', 'Bookable', 1, ['PT30M'])]
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    db_file = tmp_path / "schedule.db"
+    store = ScheduleStore(str(db_file))
+    assert not db_file.exists()
+
+    assert store.load(1, 28, DAY, 1) is None
+    assert db_file.exists()
+
+
+def test_save_and_load_a_window(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedule.db"))
+    store.save(1, 28, DAY, 1, _slots(), fetched_at=1000.0)
+
+    assert store.load(1, 28, DAY, 1) is None  # older than the TTL
+    slots, fetched_at = store.load(1, 28, DAY, 1, max_age=float('inf'))
+    assert slots == _slots()
+    assert fetched_at == 1000.0
+
+
+def test_touch_only_confirms_rows_nobody_rewrote(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedule.db"))
+    store.save(1, 28, DAY, 1, _slots(), fetched_at=1000.0)
+
+    assert store.touch(1, 28, DAY, 1, fetched_at=2000.0, expected_fetched_at=1000.0)
+    assert store.load(1, 28, DAY, 1, max_age=float('inf'))[1] == 2000.0
+
+    # Another process stores different slots: our copy no longer matches the rows
+    store.save(1, 28, DAY, 1, _slots(hour=19), fetched_at=2500.0)
+    assert not store.touch(1, 28, DAY, 1, fetched_at=3000.0, expected_fetched_at=2000.0)
+    assert store.load(1, 28, DAY, 1, max_age=float('inf')) == (_slots(hour=19), 2500.0)
@@ -0,0 +1,69 @@
+"""
+Tests for the background schedule warmer
+"""
+import threading
+
+from schedule_warmer import ScheduleWarmer
+
+
+class FakeClient:
+    """Service account client whose first logins fail"""
+
+    club_id = 1
+    zone_type_id = 28
+
+    def __init__(self, failed_logins: int = 0):
+        self.failed_logins = failed_logins
+        self.logins = 0
+        self.refreshes = 0
+        self.refreshed = threading.Event()
+        self.login_started = threading.Event()
+        self.release_login = threading.Event()
+
+    def login(self, email: str, password: str) -> bool:
+        self.login_started.set()
+        self.release_login.wait(5)
+        self.logins += 1
+        return self.logins > self.failed_logins
+
+    def refresh_schedule(self, days: int) -> bool:
+        self.refreshes += 1
+        self.refreshed.set()
+        return True
+
+
+def _warmer(client: FakeClient, **kwargs) -> ScheduleWarmer:
+    return ScheduleWarmer(client, days=3, interval=60, email="service@example.com", password="secret", **kwargs)
+
+
+def test_login_and_first_refresh_run_on_the_warmer_thread():
+    client = FakeClient()
+    warmer = _warmer(client)
+    warmer.start()
+    try:
+        # start() returned while the login is still blocked
+        assert client.login_started.wait(5)
+        assert client.refreshes == 0
+
+        client.release_login.set()
+        assert client.refreshed.wait(5)
+        assert client.logins == 1
+    finally:
+        warmer.stop()
+
+
+def test_failed_logins_are_retried_with_a_growing_delay(monkeypatch):
+    client = FakeClient(failed_logins=3)
+    client.release_login.set()
+    warmer = _warmer(client, login_retry=10, login_retry_max=25)
+    waits = []
+
+    def wait(timeout=None):
+        waits.append(timeout)
+        return False
+
+    monkeypatch.setattr(warmer._stop, "wait", wait)
+    assert warmer._login()
+    assert client.logins == 4
+    assert waits == [10, 20, 25]
+    assert warmer.login_failures == 0
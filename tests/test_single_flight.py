@@ -0,0 +1,79 @@
+"""
+Tests for single-flight coalescing of concurrent identical calls
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import single_flight
+from single_flight import SingleFlight
+
+
+class _CountingEvent(threading.Event):
+    """Event that counts the threads waiting on it"""
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = 0
+
+    def wait(self, timeout=None):
+        self.waiting += 1
+        return super().wait(timeout)
+
+
+class _ObservableCall(single_flight._Call):
+    instances = []
+
+    def __init__(self):
+        super().__init__()
+        self.done = _CountingEvent()
+        _ObservableCall.instances.append(self)
+
+
+def test_concurrent_callers_share_one_call(monkeypatch):
+    monkeypatch.setattr(single_flight, "_Call", _ObservableCall)
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "schedule"
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        leader = executor.submit(flight.do, "week", fetch)
+        started.wait(5)
+        followers = [executor.submit(flight.do, "week", fetch) for _ in range(5)]
+        # Only finish the call once every follower is waiting on it
+        call = _ObservableCall.instances[-1]
+        while call.done.waiting < 5:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result(5)] + [future.result(5) for future in followers]
+
+    assert len(calls) == 1
+    assert results == ["schedule"] * 6
+    assert not flight.in_flight("week")
+
+
+def test_error_is_shared_and_flight_cleared():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("week", fail)
+    assert not flight.in_flight("week")
+    assert flight.do("week", lambda: "ok") == "ok"
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
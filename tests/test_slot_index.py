@@ -0,0 +1,56 @@
+"""
+Tests for the time-range SlotIndex
+"""
+from datetime import date, datetime, time
+
+import pytest
+
+from schedule_parser import Slot
+from slot_index import SlotIndex
+
+# 2030-01-07 is a Monday
+STARTS = ['2030-01-08T19:00:00', '2030-01-07T18:00:00', '2030-01-14T07:30:00', '2030-01-07T07:00:00',
+          '2030-01-14T18:30:00', '2030-01-07T23:30:00', '2030-01-08T06:00:00']
+
+
+def _slot(start: str) -> Slot:
+    end = start[:14] + ('59' if start[14:16] == '30' else '30') + ':00'
+    return Slot(start, end, 'PT30M', 'Bookable', None, ['PT30M'])
+
+
+@pytest.fixture
+def index():
+    # Out of order on purpose: the index must line its slots up with its sorted table
+    return SlotIndex([_slot(start) for start in STARTS])
+
+
+def _starts(slots) -> list:
+    return [slot.start_time for slot in slots]
+
+
+def test_between_returns_slots_starting_in_the_half_open_range(index):
+    assert _starts(index.between(datetime(2030, 1, 7, 18), datetime(2030, 1, 8, 6))) == [
+        '2030-01-07T18:00:00', '2030-01-07T23:30:00']
+    assert index.between(datetime(2030, 1, 9), datetime(2030, 1, 10)) == []
+
+
+def test_on_date_whole_days_and_a_time_window(index):
+    assert _starts(index.on_date(date(2030, 1, 7))) == [
+        '2030-01-07T07:00:00', '2030-01-07T18:00:00', '2030-01-07T23:30:00']
+    assert _starts(index.on_date(date(2030, 1, 7), time(7), time(19), days=2)) == [
+        '2030-01-07T07:00:00', '2030-01-07T18:00:00']
+    assert _starts(index.on_date(datetime(2030, 1, 7, 12), start=time(18), days=2)) == [
+        '2030-01-07T18:00:00', '2030-01-07T23:30:00', '2030-01-08T19:00:00']
+
+
+def test_weekday_window_spans_weeks_in_start_order(index):
+    assert _starts(index.weekday_window(0, time(7), time(19))) == [
+        '2030-01-07T07:00:00', '2030-01-07T18:00:00', '2030-01-14T07:30:00', '2030-01-14T18:30:00']
+    assert _starts(index.weekday_window(1, time(0), time(7))) == ['2030-01-08T06:00:00']
+    assert index.weekday_window(2, time(0), time(23, 59)) == []
+
+
+def test_first_after(index):
+    assert index.first_after(datetime(2030, 1, 7, 7, 1)).start_time == '2030-01-07T18:00:00'
+    assert index.first_after(date(2030, 1, 1)).start_time == '2030-01-07T07:00:00'
+    assert index.first_after(datetime(2030, 1, 14, 18, 31)) is None
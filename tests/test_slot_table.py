@@ -0,0 +1,36 @@
+"""
+Tests for the columnar SlotTable
+"""
+from datetime import datetime
+
+import pytest
+
+from schedule_parser import Slot
+from slot_table import SlotTable
+
+
+def _slot(start: str, end: str, slot_id=1) -> Slot:
+    return Slot(start, end, 'PT30M', 'Bookable', slot_id, ['PT30M'])
+
+
+def test_round_trips_wall_clock_times_and_missing_ids():
+    slots = [_slot('2030-01-01T19:00:00', '2030-01-01T19:30:00', None),
+             _slot('2030-01-01T18:00:00', '2030-01-01T18:30:00', 5)]
+    table = SlotTable.from_slots(slots)
+
+    assert table.start_datetime(0) == datetime(2030, 1, 1, 18, 0)
+    assert list(table.ids) == [5, -1]
+    assert table.to_slots() == sorted(slots, key=lambda s: s.start_time)
+
+
+@pytest.mark.parametrize("start", ['2030-01-01T18:00:00Z', '2030-01-01T18:00:00+10:00',
+                                   '2030-01-01T18:00:00.000-05:00'])
+def test_rejects_times_with_an_offset(start):
+    with pytest.raises(ValueError, match="UTC offset"):
+        SlotTable.from_slots([_slot(start, '2030-01-01T18:30:00')])
+
+
+@pytest.mark.parametrize("slot_id", ['17', 17.0, True])
+def test_rejects_non_int_ids(slot_id):
+    with pytest.raises(ValueError, match="id"):
+        SlotTable.from_slots([_slot('2030-01-01T18:00:00', '2030-01-01T18:30:00', slot_id)])
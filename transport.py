@@ -0,0 +1,206 @@
+"""
+Tuned, instrumented HTTP transport for requests sessions
+
+An HTTPAdapter with explicit pool sizing, TCP keep-alive, an idle timeout for
+pooled connections (so we don't reuse sockets the server has likely closed)
+and compression negotiation. Per-endpoint counters record connections opened
+vs reused and bytes on the wire for compressed vs uncompressed responses, to
+size the pool for concurrent fetches and confirm handshakes are amortized.
+"""
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+
+# Which connections the current thread took from a pool during its current request
+_request_local = threading.local()
+
+_COMPRESSED_ENCODINGS = ("gzip", "deflate", "br", "zstd")
+
+
+def _keepalive_socket_options(idle: int, interval: int, count: int) -> list:
+    """Default urllib3 socket options plus TCP keep-alive probes (where the platform supports them)"""
+    options = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+    elif hasattr(socket, "TCP_KEEPALIVE"):  # macOS
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, idle))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval))
+    if hasattr(socket, "TCP_KEEPCNT"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count))
+    return options
+
+
+class _IdleTimeoutPoolMixin:
+    """Connection pool that drops connections idle longer than idle_timeout and reports opens vs reuses"""
+
+    adapter: "InstrumentedAdapter" = None  # set per adapter, which holds the (adjustable) idle timeout
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        idle_timeout = self.adapter.idle_timeout if self.adapter is not None else None
+        idle_since = getattr(conn, "_idle_since", None)
+        if idle_timeout is not None and idle_since is not None and time.monotonic() - idle_since > idle_timeout:
+            conn.close()
+        # No socket yet (new, dropped by the server, or idled out): this request opens one
+        if getattr(conn, "sock", None) is None:
+            _request_local.opened = getattr(_request_local, "opened", 0) + 1
+        else:
+            _request_local.reused = getattr(_request_local, "reused", 0) + 1
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._idle_since = time.monotonic()
+        return super()._put_conn(conn)
+
+
+class _HTTPPool(_IdleTimeoutPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _HTTPSPool(_IdleTimeoutPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class TransportStats:
+    """Per-endpoint request, connection and byte counters"""
+
+    _FIELDS = ("requests", "connections_opened", "connections_reused", "compressed_responses",
+               "compressed_wire_bytes", "compressed_body_bytes", "uncompressed_responses",
+               "uncompressed_bytes", "streamed_responses")
+
+    def __init__(self):
+        self._endpoints: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, **counts: int) -> None:
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, dict.fromkeys(self._FIELDS, 0))
+            for field, value in counts.items():
+                stats[field] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Counters per endpoint, with the connection reuse rate and compression ratio"""
+        with self._lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+        for stats in endpoints.values():
+            connections = stats["connections_opened"] + stats["connections_reused"]
+            stats["reuse_rate"] = stats["connections_reused"] / connections if connections else None
+            stats["compression_ratio"] = (stats["compressed_wire_bytes"] / stats["compressed_body_bytes"]
+                                          if stats["compressed_body_bytes"] else None)
+        return endpoints
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter with keep-alive tuning, idle timeouts and per-endpoint transfer counters"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 16, pool_block: bool = False,
+                 idle_timeout: Optional[float] = 50.0, keepalive_idle: int = 60,
+                 stats: Optional[TransportStats] = None):
+        """
+        Args:
+            pool_connections: Number of per-host pools to keep
+            pool_maxsize: Connections kept per host (size for concurrent fetches, hedges and wizards)
+            pool_block: Block when a host's pool is exhausted instead of opening extra connections
+            idle_timeout: Seconds a pooled connection may sit idle before it is replaced
+                (keep it below the server's keep-alive timeout); None never expires them
+            keepalive_idle: Seconds of silence before TCP keep-alive probes start
+            stats: Counters to record into (defaults to the process-wide ones)
+        """
+        self.idle_timeout = idle_timeout
+        self.socket_options = _keepalive_socket_options(keepalive_idle, interval=15, count=4)
+        self.stats = stats if stats is not None else shared_transport_stats
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault("socket_options", self.socket_options)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        http_pool = type("HTTPPool", (_HTTPPool,), {"adapter": self})
+        https_pool = type("HTTPSPool", (_HTTPSPool,), {"adapter": self})
+        self.poolmanager.pool_classes_by_scheme = {"http": http_pool, "https": https_pool}
+
+    def send(self, request, stream=False, **kwargs):
+        _request_local.opened = 0
+        _request_local.reused = 0
+        response = super().send(request, stream=stream, **kwargs)
+
+        endpoint = urlsplit(request.url).path
+        self.stats.add(endpoint, requests=1, connections_opened=_request_local.opened,
+                       connections_reused=_request_local.reused)
+
+        if stream:
+            # Bytes are only known once the caller has consumed the body
+            close = response.close
+            counted = []
+
+            def close_and_count():
+                if not counted:
+                    counted.append(True)
+                    self._record_bytes(endpoint, response, streamed=True)
+                close()
+
+            response.close = close_and_count
+        else:
+            # What Session.send would do next anyway; reading here lets us count the wire bytes
+            response.content
+            self._record_bytes(endpoint, response)
+        return response
+
+    def _record_bytes(self, endpoint: str, response: requests.Response, streamed: bool = False) -> None:
+        wire_bytes = response.raw.tell() if response.raw is not None else 0
+        encoding = response.headers.get("Content-Encoding", "").lower()
+        streamed_count = {"streamed_responses": 1} if streamed else {}
+        if any(codec in encoding for codec in _COMPRESSED_ENCODINGS):
+            body_bytes = 0 if streamed else len(response.content)
+            self.stats.add(endpoint, compressed_responses=1, compressed_wire_bytes=wire_bytes,
+                           compressed_body_bytes=body_bytes, **streamed_count)
+        else:
+            self.stats.add(endpoint, uncompressed_responses=1, uncompressed_bytes=wire_bytes, **streamed_count)
+
+
+def accept_encoding() -> str:
+    """Accept-Encoding for every codec urllib3 can decode here (gzip, deflate, plus br / zstd if installed)"""
+    return make_headers(accept_encoding=True)["accept-encoding"]
+
+
+def mount_transport(session: requests.Session, adapter: Optional[InstrumentedAdapter] = None) -> InstrumentedAdapter:
+    """
+    Mount the tuned adapter on a session for http:// and https:// and negotiate compression
+
+    Args:
+        session: Session to configure
+        adapter: Adapter to share (e.g. so booking wizard sessions reuse the client's warm
+            connections); a new one configured from the environment if not given
+
+    Returns:
+        The mounted adapter
+    """
+    if adapter is None:
+        adapter = InstrumentedAdapter(
+            pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+            pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "16")),
+            idle_timeout=float(os.getenv("HTTP_IDLE_TIMEOUT", "50")) or None,
+            keepalive_idle=int(os.getenv("HTTP_KEEPALIVE_IDLE", "60"))
+        )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = accept_encoding()
+    return adapter
+
+
+# Shared by every client in the process
+shared_transport_stats = TransportStats()